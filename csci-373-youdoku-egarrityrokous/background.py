@@ -0,0 +1,126 @@
+import queue
+import threading
+from cdcl import SolveInterrupted
+
+
+class BackgroundSolver:
+    """Solves boards on a worker thread, answering only the newest request.
+
+    Every submitted board is tagged with a version number. Only the newest
+    request is kept: a request that has not started yet is replaced by a
+    newer one, and one being solved is interrupted (if an interrupt
+    function was given) and its result is dropped. Results are handed back
+    through a queue, so the thread that submits boards (e.g. the Tk event
+    loop) collects them with poll and never blocks on a solve. A solve that
+    fails is reported the same way, and poll raises its exception.
+    """
+
+    def __init__(self, solve, interrupt=None, clear_interrupt=None):
+        """
+        Parameters
+        ----------
+        solve : callable
+            called on the worker thread with a SudokuBoard, returning its
+            solution or None; it may raise cdcl.SolveInterrupted
+        interrupt : callable
+            if given, called (from the submitting thread) to stop the solve
+            in progress when a newer board is submitted
+        clear_interrupt : callable
+            if given, called as each request is taken up (while submit is
+            locked out) to drop a stale interrupt, so that one issued by a
+            later submit always reaches the solve it was meant for
+        """
+        self._solve = solve
+        self._interrupt = interrupt
+        self._clear_interrupt = clear_interrupt
+        self.version = 0
+        self.solving = None
+        self.pending = None
+        self.closed = False
+        self.results = queue.Queue()
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, board):
+        """Asks for a board to be solved, superseding every earlier request.
+
+        Returns
+        -------
+        int
+            the version of this request
+        """
+        with self.condition:
+            self.version += 1
+            self.pending = (self.version, board)
+            if self.solving is not None and self._interrupt is not None:
+                self._interrupt()
+            self.condition.notify()
+            return self.version
+
+    def poll(self):
+        """Returns the result of the newest request if it has arrived.
+
+        Results of outdated requests are discarded.
+
+        Raises
+        ------
+        Exception
+            whatever the solve of the newest request raised
+
+        Returns
+        -------
+        int, SudokuBoard
+            the version and the solution (None if the board has no
+            completion), or None if the newest result is not in yet
+        """
+        answer = error = None
+        while True:
+            try:
+                version, solution, failure = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if version == self.version:
+                answer, error = (version, solution), failure
+        if error is not None:
+            raise error
+        return answer
+
+    def busy(self):
+        """Checks whether the newest request is still waiting or being solved."""
+        with self.condition:
+            return self.pending is not None or self.solving == self.version
+
+    def close(self):
+        """Stops the worker thread once the solve in progress (if any) ends."""
+        with self.condition:
+            self.closed = True
+            self.pending = None
+            if self.solving is not None and self._interrupt is not None:
+                self._interrupt()
+            self.condition.notify()
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                version, board = self.pending
+                self.pending = None
+                self.solving = version
+                if self._clear_interrupt is not None:
+                    self._clear_interrupt()
+            solution = error = None
+            try:
+                solution = self._solve(board)
+            except SolveInterrupted:
+                version = None
+            except Exception as e:
+                error = e
+            with self.condition:
+                self.solving = None
+                if version == self.version:
+                    self.results.put((version, solution, error))
@@ -0,0 +1,176 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from sudoku import SudokuBoard
+
+# Characters used for the digits 1 to 35 in puzzle lines; '0' and '.' are empty cells.
+DIGITS = '123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# Written in place of a solution for puzzles with no completion, and for
+# lines that are not a puzzle at all.
+UNSOLVABLE = 'unsolvable'
+INVALID = 'invalid'
+
+
+def parse_puzzle(line):
+    """Parses a one-line puzzle (e.g. 81 characters for 9x9) into a SudokuBoard.
+
+    Raises ValueError if the line is not a square Sudoku puzzle.
+    """
+    line = line.strip()
+    n = math.isqrt(len(line))
+    if n * n != len(line) or math.isqrt(n) ** 2 != n:
+        raise ValueError(f"Not a square Sudoku puzzle: {line!r}")
+    if n <= 9:
+        cells = [0 if ch in '.0' else int(ch) for ch in line]
+    else:
+        cells = [0 if ch in '.0' else DIGITS.index(ch.upper()) + 1 for ch in line]
+    if any(not 0 <= num <= n for num in cells):
+        raise ValueError(f"Digit out of range in puzzle: {line!r}")
+    return SudokuBoard([cells[i * n:(i + 1) * n] for i in range(n)])
+
+
+def format_puzzle(board):
+    """Formats a SudokuBoard as a one-line puzzle (the inverse of parse_puzzle)."""
+    return ''.join(DIGITS[num - 1] if num else '0' for row in board.matrix for num in row)
+
+
+def solve_chunk(lines):
+    """Solves a list of puzzle lines; runs in a worker process.
+
+    Returns
+    -------
+    list[tuple[str, float]]
+        the one-line solution (UNSOLVABLE or INVALID if there is none) and
+        the solve time in seconds of each puzzle (None for invalid lines)
+    """
+    results = []
+    for line in lines:
+        start = time.perf_counter()
+        try:
+            board = parse_puzzle(line)
+        except ValueError:
+            results.append((INVALID, None))
+            continue
+        solved = board.solve()
+        elapsed = time.perf_counter() - start
+        results.append((format_puzzle(solved) if solved is not None else UNSOLVABLE, elapsed))
+    return results
+
+
+def read_chunks(stream, chunk_size):
+    """Yields lists of up to chunk_size non-empty puzzle lines from a stream."""
+    chunk = []
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            chunk.append(line)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def percentile(ordered, fraction):
+    """Returns the nearest-rank percentile of a sorted list."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def solve_stream(stream, out, workers=None, chunk_size=64):
+    """Solves every puzzle in a stream over a process pool.
+
+    Puzzles are read lazily and sent to the workers in chunks, with at most
+    a few chunks per worker in flight, so the input is never held in memory
+    at once. Solutions are written to `out` in input order as soon as they
+    are available, one per line ("unsolvable" for puzzles with none, and
+    "invalid" for lines that cannot be parsed as a puzzle).
+
+    Parameters
+    ----------
+    stream : iterable[str]
+        puzzle lines
+    out : file
+        a writable text stream for the solutions
+    workers : int
+        the number of worker processes (defaults to the number of CPUs)
+    chunk_size : int
+        the number of puzzles per task
+
+    Returns
+    -------
+    dict
+        throughput statistics: puzzles, unsolvable, invalid, seconds,
+        puzzles_per_second and the p50/p95/p99 per-puzzle latency in
+        milliseconds (puzzles and the latencies leave out invalid lines)
+    """
+    workers = workers or os.cpu_count() or 1
+    latencies = []
+    unsolvable = invalid = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        chunks = read_chunks(stream, chunk_size)
+        for chunk in chunks:
+            pending.append(executor.submit(solve_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            for solution, elapsed in pending.popleft().result():
+                if solution == INVALID:
+                    invalid += 1
+                else:
+                    latencies.append(elapsed)
+                    if solution == UNSOLVABLE:
+                        unsolvable += 1
+                out.write(solution + '\n')
+            chunk = next(chunks, None)
+            if chunk is not None:
+                pending.append(executor.submit(solve_chunk, chunk))
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    return {'puzzles': len(latencies),
+            'unsolvable': unsolvable,
+            'invalid': invalid,
+            'seconds': seconds,
+            'puzzles_per_second': len(latencies) / seconds if seconds > 0 else None,
+            'p50_ms': _milliseconds(percentile(latencies, 0.50)),
+            'p95_ms': _milliseconds(percentile(latencies, 0.95)),
+            'p99_ms': _milliseconds(percentile(latencies, 0.99))}
+
+
+def _milliseconds(seconds):
+    return None if seconds is None else seconds * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Solve a file of Sudoku puzzles, one per line (81 or 256 characters).')
+    parser.add_argument('puzzles', help="puzzle file, or '-' for stdin")
+    parser.add_argument('-o', '--out', help='solution file (defaults to stdout)')
+    parser.add_argument('-j', '--workers', type=int, help='worker processes (defaults to all CPUs)')
+    parser.add_argument('--chunk-size', type=int, default=64, help='puzzles per worker task')
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.puzzles == '-' else open(args.puzzles)
+    out = open(args.out, 'w') if args.out else sys.stdout
+    try:
+        stats = solve_stream(source, out, args.workers, args.chunk_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    json.dump(stats, sys.stderr, indent=2)
+    print(file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import cnf
+from cnf import Clause, Cnf
+from dimacs import read_dimacs
+from search import search_solver
+from dpll import DpllSolver
+from cdcl import CdclSolver
+
+
+def random_ksat(num_vars, num_clauses, k=3, seed=0, prefix='x'):
+    """Generates a uniform random k-SAT instance.
+
+    Each clause picks k distinct variables uniformly at random and negates
+    each with probability 1/2, as in the SATLIB uf20/uf50/uf100 families.
+    The same arguments always produce the same sentence.
+
+    Parameters
+    ----------
+    num_vars : int
+        the number of variables
+    num_clauses : int
+        the number of clauses
+    k : int
+        the number of literals per clause
+    seed : int
+        the random seed
+    prefix : str
+        the symbol prefix of the variables
+
+    Returns
+    -------
+    Cnf
+        the random sentence
+    """
+
+    rng = random.Random(seed)
+    codes = [cnf.intern_symbol(f'{prefix}{n}') for n in range(1, num_vars + 1)]
+    clauses = []
+    for _ in range(num_clauses):
+        variables = rng.sample(codes, k)
+        clauses.append(Clause.from_codes([var if rng.random() < 0.5 else -var for var in variables]))
+    return Cnf(clauses)
+
+
+def pigeonhole(holes):
+    """Generates the (unsatisfiable) pigeonhole instance for holes + 1 pigeons.
+
+    Symbol p{i}_{h} means that pigeon i sits in hole h. Every pigeon sits in
+    some hole and no two pigeons share a hole.
+
+    Parameters
+    ----------
+    holes : int
+        the number of holes
+
+    Returns
+    -------
+    Cnf
+        the pigeonhole sentence
+    """
+
+    pigeons = holes + 1
+    clauses = []
+    for i in range(pigeons):
+        clauses.append(' || '.join(f'p{i}_{h}' for h in range(holes)))
+    for h in range(holes):
+        for i in range(pigeons):
+            for j in range(i + 1, pigeons):
+                clauses.append(f'!p{i}_{h} || !p{j}_{h}')
+    return cnf.sentence(*clauses)
+
+
+def default_corpus(instances_per_family=5):
+    """Yields (name, sentence) pairs for the built-in benchmark corpus.
+
+    The corpus holds uf20/uf50/uf100-style random 3-SAT instances at the
+    phase transition (clause/variable ratio of about 4.26) and pigeonhole
+    instances for 3 to 6 holes.
+    """
+
+    for num_vars, num_clauses in [(20, 91), (50, 218), (100, 430)]:
+        for seed in range(instances_per_family):
+            yield f'uf{num_vars}-{seed:02d}', random_ksat(num_vars, num_clauses, 3, seed)
+    for holes in range(3, 7):
+        yield f'php{holes + 1}-{holes}', pigeonhole(holes)
+
+
+def dimacs_corpus(directory):
+    """Yields (name, sentence) pairs for every .cnf file in a directory."""
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.cnf'):
+            yield filename, read_dimacs(os.path.join(directory, filename))
+
+
+def run_search_solver(sent):
+    return search_solver(sent)
+
+
+def run_dpll(sent, heuristic=None):
+    solver = DpllSolver(sent, heuristic)
+    return solver.solve(), solver.num_nodes
+
+
+def run_cdcl(sent):
+    solver = CdclSolver(sent)
+    return solver.solve(), solver.num_decisions
+
+
+# Maps each solver name to a function from a Cnf to (model, nodes visited),
+# and to the largest number of variables it is run on (None for no limit).
+SOLVERS = {'search_solver': (run_search_solver, 16),
+           'dpll': (run_dpll, 60),
+           'dpll-vsids': (lambda sent: run_dpll(sent, 'vsids'), None),
+           'cdcl': (run_cdcl, None)}
+
+
+def peak_memory(solve, sent):
+    """Runs a solver once under tracemalloc and returns its peak traced memory in bytes."""
+    tracemalloc.start()
+    try:
+        solve(sent)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(corpus, solvers):
+    """Runs each solver on each instance of a corpus.
+
+    Parameters
+    ----------
+    corpus : iterable[tuple[str, Cnf]]
+        the named instances
+    solvers : list[str]
+        names of solvers in SOLVERS
+
+    Yields
+    ------
+    dict
+        one record per (instance, solver) with the result ('SAT', 'UNSAT' or
+        'skipped'), wall time in seconds, nodes visited and peak traced
+        memory in kilobytes. Tracing slows the solvers down several times,
+        so the memory is measured in a second run and the time is not.
+    """
+
+    for name, sent in corpus:
+        num_vars = len(sent.get_variables())
+        for solver_name in solvers:
+            solve, max_vars = SOLVERS[solver_name]
+            record = {'instance': name, 'solver': solver_name,
+                      'vars': num_vars, 'clauses': len(sent.get_clauses())}
+            if max_vars is not None and num_vars > max_vars:
+                record['result'] = 'skipped'
+                yield record
+                continue
+            start = time.perf_counter()
+            model, nodes = solve(sent)
+            record['seconds'] = time.perf_counter() - start
+            record['peak_kb'] = peak_memory(solve, sent) / 1024
+            if model is not None and not sent.check_model(model):
+                raise AssertionError(f'{solver_name} returned a bad model for {name}')
+            record['result'] = 'SAT' if model is not None else 'UNSAT'
+            record['nodes'] = nodes
+            yield record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Youdoku SAT solvers.')
+    parser.add_argument('--solvers', nargs='+', default=sorted(SOLVERS), choices=sorted(SOLVERS))
+    parser.add_argument('--dimacs', metavar='DIR',
+                        help='benchmark the .cnf files in DIR instead of the built-in corpus')
+    parser.add_argument('--instances', type=int, default=5,
+                        help='random instances per uf family in the built-in corpus')
+    parser.add_argument('--out', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    corpus = dimacs_corpus(args.dimacs) if args.dimacs else default_corpus(args.instances)
+    records = list(run_benchmark(corpus, args.solvers))
+    if args.out:
+        with open(args.out, 'w') as writer:
+            json.dump(records, writer, indent=2)
+    else:
+        json.dump(records, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import re
+import cnf
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+
+class BranchingHeuristic(ABC):
+    """Chooses the literal that a DPLL search branches on next.
+
+    A heuristic is built for one CNF sentence and is consulted with the
+    Propagator holding the current partial assignment. The search tries the
+    returned literal first and its negation second.
+    """
+
+    def __init__(self, sent, phase_saving=False):
+        """
+        Parameters
+        ----------
+        sent : Cnf
+            the CNF sentence being searched
+        phase_saving : bool
+            if True, a variable is first tried with the polarity it had when
+            it was last unassigned
+        """
+
+        self.variables = sorted(sent.get_variables(), key=cnf.symbol_name)
+        self.clauses = [list(clause.get_codes()) for clause in sent.get_clauses()]
+        self.phase_saving = phase_saving
+        self.saved_phase = dict()
+
+    def pick(self, propagator):
+        """Returns the literal code to branch on, or None if every variable is assigned."""
+        var = self.pick_variable(propagator)
+        if var is None:
+            return None
+        return var if self.default_phase(var, propagator) > 0 else -var
+
+    @abstractmethod
+    def pick_variable(self, propagator):
+        """Returns an unassigned variable number, or None if every variable is assigned."""
+
+    def default_phase(self, var, propagator):
+        """Returns 1 to try the positive literal of `var` first, or -1 for the negative one."""
+        return self.saved_phase.get(var, 1)
+
+    def on_conflict(self, clause):
+        """Called with the literal codes of each clause falsified during search."""
+
+    def on_unassign(self, lits):
+        """Called with the literal codes that are undone on backtrack."""
+        if self.phase_saving:
+            for lit in lits:
+                self.saved_phase[abs(lit)] = 1 if lit > 0 else -1
+
+    def _first_unassigned(self, propagator):
+        values = propagator.values
+        for var in self.variables:
+            if values[var] == 0:
+                return var
+        return None
+
+    def _open_clauses(self, propagator):
+        """Yields the unassigned literals of each clause not yet satisfied."""
+        values = propagator.values
+        for clause in self.clauses:
+            open_lits = []
+            for lit in clause:
+                value = values[lit]
+                if value == 1:
+                    break
+                if value == 0:
+                    open_lits.append(lit)
+            else:
+                yield open_lits
+
+
+class AlphabeticalOrder(BranchingHeuristic):
+    """Branches on the first unassigned symbol in alphabetical order."""
+
+    def pick_variable(self, propagator):
+        return self._first_unassigned(propagator)
+
+
+class Vsids(BranchingHeuristic):
+    """Variable State Independent Decaying Sum.
+
+    Every variable starts with its number of occurrences as its activity. The
+    variables of each falsified clause are bumped, and the bump grows over
+    time so that recent conflicts outweigh old ones.
+    """
+
+    def __init__(self, sent, phase_saving=True, decay=0.95):
+        super().__init__(sent, phase_saving)
+        self.activity = defaultdict(float)
+        for clause in self.clauses:
+            for lit in clause:
+                self.activity[abs(lit)] += 1.0
+        self.increment = 1.0
+        self.decay = decay
+
+    def pick_variable(self, propagator):
+        values, activity = propagator.values, self.activity
+        best, best_activity = None, -1.0
+        for var in self.variables:
+            if values[var] == 0 and activity[var] > best_activity:
+                best, best_activity = var, activity[var]
+        return best
+
+    def default_phase(self, var, propagator):
+        return self.saved_phase.get(var, -1)
+
+    def on_conflict(self, clause):
+        for lit in clause:
+            self.activity[abs(lit)] += self.increment
+        self.increment /= self.decay
+        if self.increment > 1e100:
+            for var in self.activity:
+                self.activity[var] *= 1e-100
+            self.increment *= 1e-100
+
+
+class Dlis(BranchingHeuristic):
+    """Dynamic Largest Individual Sum.
+
+    Picks the literal that occurs most often in the clauses not yet satisfied.
+    """
+
+    def pick(self, propagator):
+        counts = defaultdict(int)
+        for open_lits in self._open_clauses(propagator):
+            for lit in open_lits:
+                counts[lit] += 1
+        if not counts:
+            var = self._first_unassigned(propagator)
+            return None if var is None else var * self.default_phase(var, propagator)
+        lit = max(counts, key=lambda lit: (counts[lit], -abs(lit)))
+        if self.phase_saving and abs(lit) in self.saved_phase:
+            return abs(lit) * self.saved_phase[abs(lit)]
+        return lit
+
+    def pick_variable(self, propagator):
+        lit = self.pick(propagator)
+        return None if lit is None else abs(lit)
+
+
+class Moms(BranchingHeuristic):
+    """Maximum Occurrences in clauses of Minimum Size.
+
+    Among the shortest clauses not yet satisfied, picks the variable that
+    maximizes (f(x) + f(!x)) * 2^k + f(x) * f(!x), where f counts occurrences
+    of a literal in those clauses, and tries its more frequent polarity first.
+    """
+
+    def __init__(self, sent, phase_saving=False, k=4):
+        super().__init__(sent, phase_saving)
+        self.k = k
+
+    def pick(self, propagator):
+        shortest, counts = None, defaultdict(int)
+        for open_lits in self._open_clauses(propagator):
+            if not open_lits:
+                continue
+            if shortest is None or len(open_lits) < shortest:
+                shortest, counts = len(open_lits), defaultdict(int)
+            if len(open_lits) == shortest:
+                for lit in open_lits:
+                    counts[lit] += 1
+        if not counts:
+            var = self._first_unassigned(propagator)
+            return None if var is None else var * self.default_phase(var, propagator)
+        weight = 2 ** self.k
+
+        def score(var):
+            positive, negative = counts[var], counts[-var]
+            return ((positive + negative) * weight + positive * negative, -var)
+
+        var = max({abs(lit) for lit in counts}, key=score)
+        if self.phase_saving and var in self.saved_phase:
+            return var * self.saved_phase[var]
+        return var if counts[var] >= counts[-var] else -var
+
+    def pick_variable(self, propagator):
+        lit = self.pick(propagator)
+        return None if lit is None else abs(lit)
+
+
+class MostConstrainedCell(BranchingHeuristic):
+    """Sudoku-specific ordering: fill the cell with the fewest remaining digits.
+
+    Symbols of the form d{digit}_{row}_{col} (see sudoku.py) are grouped by
+    cell. The heuristic picks the open cell with the fewest digits that are
+    not yet ruled out and assigns it its lowest remaining digit. Any other
+    symbols are branched on alphabetically once every cell is decided.
+    """
+
+    SYMBOL = re.compile(r'd(\d+)_(\d+)_(\d+)$')
+
+    def __init__(self, sent, phase_saving=False):
+        super().__init__(sent, phase_saving)
+        cells = defaultdict(list)
+        for var in self.variables:
+            match = self.SYMBOL.match(cnf.symbol_name(var))
+            if match is not None:
+                digit, row, col = (int(x) for x in match.groups())
+                cells[(row, col)].append((digit, var))
+        self.cells = [[var for _, var in sorted(digits)] for _, digits in sorted(cells.items())]
+
+    def pick_variable(self, propagator):
+        values = propagator.values
+        best, best_count = None, None
+        for cell in self.cells:
+            candidates = []
+            for var in cell:
+                value = values[var]
+                if value == 1:
+                    break
+                if value == 0:
+                    candidates.append(var)
+            else:
+                if candidates and (best_count is None or len(candidates) < best_count):
+                    best, best_count = candidates[0], len(candidates)
+                    if best_count == 1:
+                        break
+        if best is not None:
+            return best
+        return self._first_unassigned(propagator)
+
+
+HEURISTICS = {'alphabetical': AlphabeticalOrder,
+              'vsids': Vsids,
+              'dlis': Dlis,
+              'moms': Moms,
+              'cell': MostConstrainedCell}
+
+
+def make_heuristic(heuristic, sent):
+    """Builds a branching heuristic for a sentence.
+
+    Parameters
+    ----------
+    heuristic : str or BranchingHeuristic
+        a name from HEURISTICS, or an already constructed heuristic
+    sent : Cnf
+        the CNF sentence being searched
+
+    Returns
+    -------
+    BranchingHeuristic
+        the heuristic (None if `heuristic` is None)
+    """
+
+    if heuristic is None or isinstance(heuristic, BranchingHeuristic):
+        return heuristic
+    if heuristic not in HEURISTICS:
+        raise ValueError(f"Unknown branching heuristic: {heuristic}")
+    return HEURISTICS[heuristic](sent)
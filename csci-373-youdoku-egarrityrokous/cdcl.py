@@ -0,0 +1,395 @@
+import cnf
+import random
+from dpll import Propagator
+from heapq import heappush, heappop
+
+
+class SolveInterrupted(Exception):
+    """Raised by CdclSolver.solve when its search is interrupted."""
+
+
+def luby(i):
+    """Returns the i-th element (counting from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ..."""
+    x = i - 1
+    size, exponent = 1, 0
+    while size < x + 1:
+        exponent += 1
+        size = 2 * size + 1
+    while size - 1 != x:
+        size = (size - 1) // 2
+        exponent -= 1
+        x = x % size
+    return 2 ** exponent
+
+
+class CdclSolver:
+    """A conflict-driven clause learning (CDCL) satisfiability solver.
+
+    On every conflict the solver derives a first-UIP learned clause, jumps
+    back to the second-highest decision level in that clause, and adds the
+    clause to its database. Branching uses VSIDS variable activities with
+    phase saving. The search restarts after a number of conflicts given by
+    a Luby or geometric schedule, and at each restart the least active half
+    of the learned clauses is deleted once the database outgrows its limit.
+
+    A solver can be asked to solve repeatedly under different assumptions
+    (literals that are taken as the first decisions). Learned clauses only
+    depend on the sentence, so they are kept from one call to the next.
+    """
+
+    def __init__(self, sent, restarts='luby', restart_base=100, var_decay=0.95,
+                 clause_decay=0.999, phase=-1, seed=None):
+        """
+        Parameters
+        ----------
+        sent : Cnf
+            a CNF sentence for which we want to find a satisfying model
+        restarts : str
+            the restart schedule: 'luby', 'geometric' or None (never restart)
+        restart_base : int
+            the number of conflicts in the first restart interval
+        var_decay : float
+            the VSIDS decay factor for variable activities
+        clause_decay : float
+            the decay factor for learned clause activities
+        phase : int
+            the polarity tried first for a variable that has never been
+            assigned: -1 for negative, 1 for positive
+        seed : int
+            if given, the variables start with small random activities drawn
+            from this seed instead of all zero, which changes the initial
+            branching order (e.g. to diversify a portfolio)
+        """
+
+        if restarts not in ('luby', 'geometric', None):
+            raise ValueError(f"Unknown restart schedule: {restarts}")
+        if phase not in (-1, 1):
+            raise ValueError(f"Unknown phase: {phase}")
+        self.propagator = Propagator(sent)
+        self.variables = sorted(sent.get_variables(), key=cnf.symbol_name)
+        num_slots = self.propagator.num_vars + 1
+        self.activity = [0.0] * num_slots
+        if seed is not None:
+            rng = random.Random(seed)
+            for var in self.variables:
+                self.activity[var] = rng.random() * 1e-3
+        self.phase = [phase] * num_slots
+        self.var_inc = 1.0
+        self.var_decay = var_decay
+        self.clause_activity = [0.0] * len(self.propagator.clauses)
+        self.clause_inc = 1.0
+        self.clause_decay = clause_decay
+        self.num_original = len(self.propagator.clauses)
+        self.max_learnts = max(self.num_original // 3, 1000)
+        self.restarts = restarts
+        self.restart_base = restart_base
+        self.heap = []
+        for var in self.variables:
+            heappush(self.heap, (-self.activity[var], var))
+        self.assumptions = []
+        # indices of clauses added by add_clause, which _reduce_db must keep
+        self.permanent = set()
+        self.num_decisions = 0
+        self.num_conflicts = 0
+        self.num_restarts = 0
+        self.interrupted = False
+
+    def solve(self, assumptions=()):
+        """Searches for a satisfying model.
+
+        Parameters
+        ----------
+        assumptions : iterable[int]
+            literal codes that the model must make true (see cnf.literal_code);
+            ValueError is raised for a literal whose code is out of range
+            for the sentence
+
+        Returns
+        -------
+        dict[str, bool]
+            a satisfying model (if one exists), otherwise None is returned
+
+        Raises
+        ------
+        SolveInterrupted
+            if interrupt is called (e.g. from another thread) during the
+            search, or was called before it and not cleared since; the
+            solver can be used again afterwards
+        """
+
+        propagator = self.propagator
+        assumptions = list(assumptions)
+        for lit in assumptions:
+            if not 0 < abs(lit) <= propagator.num_vars:
+                raise ValueError(f"Assumption on a variable outside the sentence: {lit}")
+        try:
+            return self._solve(assumptions)
+        finally:
+            self.interrupted = False
+
+    def _solve(self, assumptions):
+        propagator = self.propagator
+        self._backtrack(0)
+        if propagator.propagate() is not None:
+            return None
+        self.assumptions = assumptions
+        restart = 0
+        while True:
+            restart += 1
+            if self.restarts == 'luby':
+                budget = self.restart_base * luby(restart)
+            elif self.restarts == 'geometric':
+                budget = int(self.restart_base * 1.5 ** (restart - 1))
+            else:
+                budget = None
+            status, model = self._search(budget)
+            if status is not None:
+                self._backtrack(0)
+                return model
+            if self.interrupted:
+                self._backtrack(0)
+                raise SolveInterrupted("The search was interrupted")
+            self.num_restarts += 1
+            self._backtrack(0)
+            if len(propagator.clauses) - self.num_original > self.max_learnts:
+                self._reduce_db()
+                self.max_learnts = int(self.max_learnts * 1.1)
+
+    def interrupt(self):
+        """Asks the search running in solve (or the next one) to stop at its next conflict.
+
+        The request is consumed when solve returns, or dropped by
+        clear_interrupt.
+        """
+        self.interrupted = True
+
+    def clear_interrupt(self):
+        """Drops an interrupt request that no search has consumed yet."""
+        self.interrupted = False
+
+    def add_clause(self, codes):
+        """Adds a clause to the sentence between calls to solve.
+
+        The clause is kept for every later call, like the clauses of the
+        original sentence (e.g. a clause blocking a model already found).
+
+        Parameters
+        ----------
+        codes : iterable[int]
+            the literal codes of the clause
+        """
+
+        propagator = self.propagator
+        codes = list(dict.fromkeys(codes))
+        for lit in codes:
+            if not 0 < abs(lit) <= propagator.num_vars:
+                raise ValueError(f"Clause on a variable outside the sentence: {lit}")
+        self._backtrack(0)
+        if propagator.propagate() is not None:
+            return
+        values = propagator.values
+        if any(values[lit] == 1 or -lit in codes for lit in codes):
+            return
+        codes = [lit for lit in codes if values[lit] == 0]
+        index = propagator.add_clause(codes)
+        self.clause_activity.append(0.0)
+        self.permanent.add(index)
+
+    def _search(self, budget):
+        """Runs CDCL until a model is found, unsatisfiability is proven or the
+        conflict budget runs out.
+
+        Returns
+        -------
+        bool, dict[str, bool]
+            True and a model if one was found, False and None if the sentence
+            is unsatisfiable under the assumptions, or None and None if the
+            budget ran out or the search was interrupted
+        """
+
+        propagator = self.propagator
+        assumptions = self.assumptions
+        conflicts = 0
+        while True:
+            conflict = propagator.propagate()
+            if conflict is not None:
+                self.num_conflicts += 1
+                conflicts += 1
+                if propagator.decision_level() == 0:
+                    return False, None
+                if self.interrupted:
+                    return None, None
+                learnt, level = self._analyze(conflict)
+                self._backtrack(level)
+                self._learn(learnt)
+                self.var_inc /= self.var_decay
+                self.clause_inc /= self.clause_decay
+            else:
+                if budget is not None and conflicts >= budget:
+                    return None, None
+                level = propagator.decision_level()
+                if level < len(assumptions):
+                    lit = assumptions[level]
+                    value = propagator.values[lit]
+                    if value == -1:
+                        return False, None
+                    propagator.new_level()
+                    if value == 0:
+                        propagator.enqueue(lit)
+                    continue
+                var = self._pick_branch_variable()
+                if var is None:
+                    return True, cnf.model_from_codes(propagator.trail)
+                self.num_decisions += 1
+                propagator.new_level()
+                propagator.enqueue(var if self.phase[var] > 0 else -var)
+
+    def _pick_branch_variable(self):
+        values, activity, heap = self.propagator.values, self.activity, self.heap
+        while heap:
+            negative_activity, var = heappop(heap)
+            if values[var] == 0 and -negative_activity == activity[var]:
+                return var
+        for var in self.variables:
+            if values[var] == 0:
+                return var
+        return None
+
+    def _backtrack(self, level):
+        """Undoes assignments above `level`, saving phases and requeueing variables."""
+        propagator = self.propagator
+        if propagator.decision_level() <= level:
+            return
+        for lit in propagator.trail[propagator.trail_lim[level]:]:
+            var = abs(lit)
+            self.phase[var] = 1 if lit > 0 else -1
+            heappush(self.heap, (-self.activity[var], var))
+        propagator.cancel_until(level)
+
+    def _bump_variable(self, var):
+        self.activity[var] += self.var_inc
+        if self.activity[var] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.var_inc *= 1e-100
+            self.heap = [(-self.activity[v], v) for v in self.variables
+                         if self.propagator.values[v] == 0]
+            self.heap.sort()
+        elif self.propagator.values[var] == 0:
+            heappush(self.heap, (-self.activity[var], var))
+
+    def _bump_clause(self, index):
+        if index >= self.num_original:
+            self.clause_activity[index] += self.clause_inc
+            if self.clause_activity[index] > 1e20:
+                self.clause_activity = [a * 1e-20 for a in self.clause_activity]
+                self.clause_inc *= 1e-20
+
+    def _analyze(self, conflict):
+        """Derives the first-UIP clause of a conflict.
+
+        Returns
+        -------
+        list[int], int
+            the learned clause (asserting literal first, then a literal of the
+            backjump level) and the level to jump back to
+        """
+
+        propagator = self.propagator
+        levels, reasons, trail = propagator.levels, propagator.reasons, propagator.trail
+        level = propagator.decision_level()
+        seen = set()
+        learnt = [0]
+        pending = 0
+        lit = 0
+        index = len(trail) - 1
+        clause_index = conflict
+        while True:
+            self._bump_clause(clause_index)
+            for other in propagator.clauses[clause_index]:
+                var = abs(other)
+                if other == lit or var in seen or levels[var] == 0:
+                    continue
+                seen.add(var)
+                self._bump_variable(var)
+                if levels[var] == level:
+                    pending += 1
+                else:
+                    learnt.append(other)
+            while abs(trail[index]) not in seen:
+                index -= 1
+            lit = trail[index]
+            index -= 1
+            seen.discard(abs(lit))
+            pending -= 1
+            if pending == 0:
+                break
+            clause_index = reasons[abs(lit)]
+        learnt[0] = -lit
+
+        # drop literals implied by the rest of the clause through their reasons
+        in_clause = {abs(other) for other in learnt}
+        minimized = [learnt[0]]
+        for other in learnt[1:]:
+            reason = reasons[abs(other)]
+            if reason is None or any(abs(x) not in in_clause and levels[abs(x)] > 0
+                                     for x in propagator.clauses[reason] if x != -other):
+                minimized.append(other)
+        learnt = minimized
+
+        if len(learnt) == 1:
+            return learnt, 0
+        highest = max(range(1, len(learnt)), key=lambda i: levels[abs(learnt[i])])
+        learnt[1], learnt[highest] = learnt[highest], learnt[1]
+        return learnt, levels[abs(learnt[1])]
+
+    def _learn(self, learnt):
+        """Adds a learned clause after backjumping and asserts its first literal."""
+        propagator = self.propagator
+        if len(learnt) == 1:
+            propagator.enqueue(learnt[0])
+            return
+        index = propagator.add_clause(learnt)
+        self.clause_activity.append(self.clause_inc)
+        propagator.enqueue(learnt[0], index)
+
+    def _reduce_db(self):
+        """Deletes the less active half of the learned clauses (binary clauses are kept)."""
+        propagator = self.propagator
+        learned = range(self.num_original, len(propagator.clauses))
+        candidates = sorted((i for i in learned
+                             if len(propagator.clauses[i]) > 2 and i not in self.permanent),
+                            key=lambda i: self.clause_activity[i])
+        dropped = set(candidates[:len(candidates) // 2])
+        keep = {i for i in range(len(propagator.clauses)) if i not in dropped}
+        remap = propagator.compact(keep)
+        activity = [0.0] * len(propagator.clauses)
+        for old, new in remap.items():
+            activity[new] = self.clause_activity[old]
+        self.clause_activity = activity
+        self.permanent = {remap[i] for i in self.permanent}
+
+
+def cdcl(sent, restarts='luby', preprocess=False):
+    """A conflict-driven clause learning solver for satisfiability.
+
+    Parameters
+    ----------
+    sent : cnf.Sentence
+        the CNF sentence for which we want to find a satisfying model.
+    restarts : str
+        the restart schedule: 'luby', 'geometric' or None
+    preprocess : bool
+        if True, `sent` is first simplified by cnf.preprocess and the model
+        found for the simplified sentence is extended back to `sent`
+
+    Returns
+    -------
+    dict[str, bool]
+        a satisfying model (if one exists), otherwise None is returned
+    """
+
+    if preprocess:
+        simplified, preprocessor = cnf.preprocess(sent)
+        model = CdclSolver(simplified, restarts=restarts).solve()
+        return preprocessor.extend_model(model) if model is not None else None
+    return CdclSolver(sent, restarts=restarts).solve()
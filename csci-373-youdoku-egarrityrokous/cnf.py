@@ -1,5 +1,62 @@
+from array import array
 from collections import defaultdict
 
+# The variable table. Every symbol is interned once and numbered from 1, so
+# that internally a literal is just a signed integer (DIMACS-style): +v for
+# the positive literal of variable v and -v for its negation. Symbol strings
+# are only looked up again when printing or building models.
+_symbols = [None]
+_variables = dict()
+
+
+def intern_symbol(symbol):
+    """Returns the variable number of a symbol, allocating a new one if needed.
+
+    Parameters
+    ----------
+    symbol : str
+        the symbol to intern
+
+    Returns
+    -------
+    int
+        the (positive) variable number of the symbol
+    """
+    var = _variables.get(symbol)
+    if var is None:
+        var = len(_symbols)
+        _variables[symbol] = var
+        _symbols.append(symbol)
+    return var
+
+
+def lookup_variable(symbol):
+    """Returns the variable number of a symbol, or None if it was never interned."""
+    return _variables.get(symbol)
+
+
+def symbol_name(var):
+    """Returns the symbol of a variable number (the sign of `var` is ignored)."""
+    return _symbols[abs(var)]
+
+
+def literal_code(symbol, polarity=True):
+    """Returns the signed integer code of a literal."""
+    var = intern_symbol(symbol)
+    return var if polarity else -var
+
+
+def model_from_codes(codes):
+    """Converts an iterable of true literal codes into a model dictionary.
+
+    Returns
+    -------
+    dict[str, bool]
+        maps the symbol of each literal to its polarity
+    """
+    return {_symbols[abs(code)]: code > 0 for code in codes}
+
+
 def l(s):
     """Convenience function for constructing literals.
         
@@ -28,7 +85,8 @@ def c(s):
         literal_strings = []
     else:
         literal_strings = [x.strip() for x in s.split('||')]
-    return Clause([l(x) for x in literal_strings])
+    return Clause.from_codes([literal_code(x[1:], False) if x[0] == '!' else literal_code(x)
+                              for x in literal_strings])
 
 def sentence(*clauses):
     """Convenience function for constructing CNF sentences.
@@ -40,8 +98,16 @@ def sentence(*clauses):
     return Cnf([c(clause.strip()) for clause in clauses])
 
 
+
+
 class Literal:
-    """A class representing a literal in propositional logic."""
+    """A class representing a literal in propositional logic.
+
+    Internally a literal is stored as a signed integer code (see intern_symbol),
+    so hashing, comparison and negation never touch the symbol string.
+    """
+
+    __slots__ = ('code',)
 
     def __init__(self, symbol, polarity=True):
         """
@@ -53,8 +119,22 @@ class Literal:
             the literal's polarity (i.e., whether it's true or false)
         """
 
-        self.symbol = symbol
-        self.polarity = polarity
+        self.code = literal_code(symbol, polarity)
+
+    @classmethod
+    def from_code(cls, code):
+        """Constructs a literal directly from its signed integer code."""
+        lit = cls.__new__(cls)
+        lit.code = code
+        return lit
+
+    @property
+    def symbol(self):
+        return _symbols[abs(self.code)]
+
+    @property
+    def polarity(self):
+        return self.code > 0
 
     def get_symbol(self):
         """Returns the literal's symbol."""
@@ -64,6 +144,10 @@ class Literal:
         """Returns the literal's polarity."""
         return self.polarity
 
+    def get_code(self):
+        """Returns the literal's signed integer code."""
+        return self.code
+
     def negate(self):
         """Returns a negated version of the literal.
 
@@ -76,23 +160,26 @@ class Literal:
             a new Literal, which is the negation of the current Literal
         """
 
-        return Literal(self.symbol, not self.polarity)
+        return Literal.from_code(-self.code)
 
     def __eq__(self, other):
         """Value-based equality. Checks whether two literals have the same symbol and polarity."""
-        return self.symbol == other.symbol and self.polarity == other.polarity
-    
+        return isinstance(other, Literal) and self.code == other.code
+
     def __lt__(self, other):
-        if self.symbol < other.symbol:
-            return True
-        elif other.symbol < self.symbol:
+        if self.code == other.code:
             return False
-        else:
-            return self.polarity < other.polarity
+        if abs(self.code) == abs(other.code):
+            return self.code < other.code
+        return self.symbol < other.symbol
 
     def __hash__(self):
-        return hash(self.symbol) + hash(self.polarity)
-    
+        return hash(self.code)
+
+    def __reduce__(self):
+        # variable numbers are local to a process, so pickle by symbol
+        return (Literal, (self.symbol, self.polarity))
+
     def __str__(self):
         result = ''
         if not self.polarity:
@@ -104,7 +191,14 @@ class Literal:
 
 
 class Clause:
-    """A class representing a CNF clause in propositional logic."""
+    """A class representing a CNF clause in propositional logic.
+
+    The literals are kept as a sorted, duplicate-free array of signed
+    integer codes, which doubles as the clause's canonical form for
+    hashing and equality.
+    """
+
+    __slots__ = ('codes', '_hash')
 
     def __init__(self, literals):
         """
@@ -114,65 +208,85 @@ class Clause:
             the literals of the clause
         """
 
-        self.literals = literals
-        self.literal_values = None
+        self.codes = array('i', sorted({lit.code for lit in literals}))
+        self._hash = None
+
+    @classmethod
+    def from_codes(cls, codes):
+        """Constructs a clause directly from an iterable of literal codes."""
+        clause = cls.__new__(cls)
+        clause.codes = array('i', sorted(set(codes)))
+        clause._hash = None
+        return clause
+
+    @property
+    def literals(self):
+        return self.get_literals()
 
     def get_literals(self):
         """Returms the literals of the clause, as a list."""
-        return self.literals
+        return [Literal.from_code(code) for code in self.codes]
+
+    def get_codes(self):
+        """Returns the signed integer codes of the clause's literals."""
+        return self.codes
 
     def get_symbols(self):
         """Returms the set of all symbols found in the clause."""
-        return set([l.symbol for l in self.literals])
+        return {_symbols[abs(code)] for code in self.codes}
 
     def __len__(self):
         """Returns the number of literals in the clause."""
-        return len(self.literals)
+        return len(self.codes)
 
     def __bool__(self):
         """Returns True iff the clause contains at least one literal."""
-        return len(self.literals) > 0
+        return len(self.codes) > 0
 
     def __eq__(self, other):
         """Value-based equality. Checks whether the clauses have the same literals."""
-        return set(self.literals) == set(other.literals)
+        return isinstance(other, Clause) and self.codes == other.codes
 
     def __lt__(self, other):
         return str(self) < str(other)
 
     def __hash__(self):
-        return hash(tuple(sorted(self.literals)))
+        if self._hash is None:
+            self._hash = hash(self.codes.tobytes())
+        return self._hash
+
+    def __reduce__(self):
+        return (Clause, (self.get_literals(),))
 
     def __str__(self):
-        if len(self.literals) == 0:
+        if len(self.codes) == 0:
             return 'FALSE'
         else:
-            ordered = sorted(self.literals)
+            ordered = sorted(self.get_literals())
             return ' || '.join([str(l) for l in ordered])
 
     def __repr__(self):
         return f'Clause({str(self)})'
 
-    def _get_literal_polarities(self):
-        if self.literal_values is None:
-            self.literal_values = dict()
-            for lit in self.literals:
-                self.literal_values[lit.symbol] = lit.polarity
-        return self.literal_values
-
     def __contains__(self, sym):
-        return sym in self._get_literal_polarities()
+        var = _variables.get(sym)
+        return var is not None and (var in self.codes or -var in self.codes)
 
     def __getitem__(self, sym):
-        return self._get_literal_polarities()[sym]
-    
+        var = _variables.get(sym)
+        if var is not None:
+            if var in self.codes:
+                return True
+            if -var in self.codes:
+                return False
+        raise KeyError(sym)
+
     def __or__(self, other):
-        polarities, other_polarities = self._get_literal_polarities(), other._get_literal_polarities()
-        common_symbols = polarities.keys() & other_polarities.keys()
-        for sym in common_symbols:
-            if polarities[sym] != other_polarities[sym]:
+        codes = set(self.codes)
+        for code in other.codes:
+            if -code in codes:
                 return None
-        return Clause(list(set(self.literals + other.literals)))
+        return Clause.from_codes(codes.union(other.codes))
 
 
 class Cnf:
@@ -188,6 +302,20 @@ class Cnf:
 
         self.clauses = set(clauses)
 
+    def get_variables(self):
+        """Returns the set of all variable numbers in the sentence.
+
+        Returns
+        -------
+        set[int]
+            the (positive) variable numbers of the symbols in the sentence
+        """
+
+        variables = set()
+        for clause in self.clauses:
+            variables.update(abs(code) for code in clause.codes)
+        return variables
+
     def get_symbols(self):
         """Returns a set of all symbols in the sentence.
 
@@ -197,10 +325,7 @@ class Cnf:
             a set of all the symbols found in the sentence
         """
 
-        syms = set([])
-        for clause in self.clauses:
-            syms = syms | clause.get_symbols()
-        return syms
+        return {_symbols[var] for var in self.get_variables()}
 
     def get_clauses(self):
         """Returns a set of all clauses in the sentence.
@@ -212,9 +337,9 @@ class Cnf:
         """
 
         return self.clauses
-    
+
     def __str__(self):
-        clause_strs = sorted([str(c) for c in self.clauses])     
+        clause_strs = sorted([str(c) for c in self.clauses])
         return '\n'.join(clause_strs)
 
     def __repr__(self):
@@ -238,18 +363,364 @@ class Cnf:
         bool
             whether the model satisfies the sentence
         """
-        clauses = self.get_clauses()
-        for clause in clauses:
-            isSatisfied = False
-            for literal in clause.get_literals():
-                if model[literal.get_symbol()] == literal.get_polarity():
-                    isSatisfied = True
-                elif model[literal.get_symbol()] != literal.get_polarity():
-                    continue
-            if isSatisfied == False:
+        true_codes = set()
+        for sym, value in model.items():
+            var = _variables.get(sym)
+            if var is not None:
+                true_codes.add(var if value else -var)
+        for clause in self.clauses:
+            if true_codes.isdisjoint(clause.codes):
                 return False
         return True
 
 
-            
-    
+class CompiledCnf:
+    """A Cnf compiled once for checking many complete assignments quickly.
+
+    Every variable of the sentence gets a bit position, and an assignment is
+    packed into a single int with the bits of its true variables set. Each
+    clause becomes a pair of masks over those bits, one for its positive and
+    one for its negative literals, so that checking a clause is a couple of
+    bitwise operations on the packed assignment. Tautologies are dropped at
+    compile time, and the check stops at the first falsified clause.
+    """
+
+    def __init__(self, sent):
+        """
+        Parameters
+        ----------
+        sent : Cnf
+            the CNF sentence to compile
+        """
+
+        self.bits = {var: 1 << i for i, var in enumerate(sorted(sent.get_variables()))}
+        self.positive = []
+        self.negative = []
+        for clause in sent.get_clauses():
+            positive = negative = 0
+            for code in clause.codes:
+                if code > 0:
+                    positive |= self.bits[code]
+                else:
+                    negative |= self.bits[-code]
+            if positive & negative == 0:
+                self.positive.append(positive)
+                self.negative.append(negative)
+
+    def pack(self, codes):
+        """Packs the true literal codes of an assignment into an int.
+
+        Codes of variables that do not occur in the sentence are ignored.
+        """
+        bits = self.bits
+        assignment = 0
+        for code in codes:
+            if code > 0:
+                assignment |= bits.get(code, 0)
+        return assignment
+
+    def check_packed(self, assignment):
+        """Checks whether a packed complete assignment (see pack) satisfies the sentence."""
+        unassigned = ~assignment
+        for positive, negative in zip(self.positive, self.negative):
+            if not (assignment & positive or unassigned & negative):
+                return False
+        return True
+
+    def check_codes(self, codes):
+        """Checks whether the complete assignment given by its true literal codes is a model."""
+        return self.check_packed(self.pack(codes))
+
+
+class Preprocessor:
+    """Simplifies a Cnf before search, keeping what is needed to rebuild models.
+
+    The following rules are applied until none of them changes anything:
+    - unit propagation: a unit clause fixes its literal;
+    - pure literals: a literal whose negation never occurs is made true;
+    - subsumption: a clause that contains another clause is dropped;
+    - self-subsuming resolution: if C contains all of D except that D has
+      !l where C has l, then !l is removed from D;
+    - bounded variable elimination: a variable is replaced by all the
+      non-tautological resolvents of its positive and negative clauses when
+      that does not increase the number of clauses.
+
+    The simplified sentence is satisfiable iff the original one is, but its
+    models need not be models of the original. Every removed clause that is
+    not implied by the rest is pushed onto an elimination stack together
+    with a witness literal; extend_model replays the stack backwards,
+    making the witness true whenever its clause is falsified, which turns a
+    model of the simplified sentence into a model of the original.
+    """
+
+    def __init__(self, sent, frozen=(), max_resolvent=16, max_occurrences=64):
+        """
+        Parameters
+        ----------
+        sent : Cnf
+            the CNF sentence to simplify
+        frozen : iterable[int]
+            variables that must keep occurring in the simplified sentence
+            (e.g. those that will be assumed), so they are never eliminated
+        max_resolvent : int
+            resolvents longer than this block the elimination of a variable
+        max_occurrences : int
+            variables occurring more often than this are not eliminated
+        """
+
+        self.variables = sent.get_variables()
+        self.frozen = {abs(var) for var in frozen}
+        self.max_resolvent = max_resolvent
+        self.max_occurrences = max_occurrences
+        self.clauses = []
+        self.occurs = defaultdict(set)
+        self.units = []
+        self.fixed = dict()
+        self.eliminated = set()
+        self.queue = set()
+        self.stack = []
+        self.unsat = False
+        self.num_units = 0
+        self.num_pure = 0
+        self.num_subsumed = 0
+        self.num_strengthened = 0
+        self.num_eliminated = 0
+        for clause in sent.get_clauses():
+            codes = set(clause.codes)
+            if not any(-code in codes for code in codes):
+                self._add(codes)
+
+    def run(self):
+        """Simplifies the sentence.
+
+        Returns
+        -------
+        Cnf
+            the simplified sentence (containing the empty clause if the
+            original sentence was found to be unsatisfiable)
+        """
+
+        queue = self.queue
+        queue.update(range(len(self.clauses)))
+        changed = True
+        while changed and not self.unsat:
+            changed = self._propagate()
+            while queue and not self.unsat:
+                self._subsume(queue.pop())
+                changed = self._propagate() or changed
+            if self.unsat:
+                break
+            changed = self._eliminate_pure() or changed
+            changed = self._eliminate_variables() or changed
+        if self.unsat:
+            return Cnf([Clause.from_codes([])])
+        clauses = [Clause.from_codes(codes) for codes in self.clauses if codes is not None]
+        clauses += [Clause.from_codes([lit]) for var, lit in self.fixed.items() if var in self.frozen]
+        # frozen variables that no longer occur are kept in the sentence
+        # through a tautology, so that they can still be assumed
+        clauses += [Clause.from_codes([var, -var]) for var in self.frozen
+                    if var in self.variables and var not in self.fixed
+                    and not self.occurs[var] and not self.occurs[-var]]
+        return Cnf(clauses)
+
+    def extend_model(self, model):
+        """Extends a model of the simplified sentence to a model of the original.
+
+        Parameters
+        ----------
+        model : dict[str, bool]
+            a model of the sentence returned by run
+
+        Returns
+        -------
+        dict[str, bool]
+            a model assigning every symbol of the original sentence
+        """
+
+        values = {var: False for var in self.variables}
+        for symbol, value in model.items():
+            var = _variables.get(symbol)
+            if var is not None:
+                values[var] = value
+        for witness, codes in reversed(self.stack):
+            if not any(values[abs(code)] == (code > 0) for code in codes):
+                values[abs(witness)] = witness > 0
+        result = dict(model)
+        result.update((_symbols[var], value) for var, value in values.items())
+        return result
+
+    def _add(self, codes):
+        if not codes:
+            self.unsat = True
+            return None
+        index = len(self.clauses)
+        self.clauses.append(codes)
+        for code in codes:
+            self.occurs[code].add(index)
+        if len(codes) == 1:
+            self.units.append(next(iter(codes)))
+        return index
+
+    def _remove(self, index):
+        for code in self.clauses[index]:
+            self.occurs[code].discard(index)
+        self.clauses[index] = None
+
+    def _strengthen(self, index, code):
+        codes = self.clauses[index]
+        codes.discard(code)
+        self.occurs[code].discard(index)
+        self.num_strengthened += 1
+        if not codes:
+            self.unsat = True
+        elif len(codes) == 1:
+            self.units.append(next(iter(codes)))
+        self.queue.add(index)
+
+    def _assign(self, lit):
+        var = abs(lit)
+        if var in self.fixed:
+            if self.fixed[var] != lit:
+                self.unsat = True
+            return
+        self.fixed[var] = lit
+        self.stack.append((lit, (lit,)))
+
+    def _propagate(self):
+        """Applies the pending unit clauses. Returns True if anything changed."""
+        changed = False
+        while self.units and not self.unsat:
+            lit = self.units.pop()
+            if self.fixed.get(abs(lit)) == lit:
+                continue
+            self._assign(lit)
+            if self.unsat:
+                break
+            self.num_units += 1
+            changed = True
+            for index in list(self.occurs[lit]):
+                self._remove(index)
+            for index in list(self.occurs[-lit]):
+                self._strengthen(index, -lit)
+        return changed
+
+    def _subsume(self, index):
+        """Uses clause `index` to drop the clauses it subsumes and strengthen others."""
+        codes = self.clauses[index]
+        if codes is None:
+            return
+        occurs = self.occurs
+        pivot = min(codes, key=lambda code: len(occurs[code]) + len(occurs[-code]))
+        for other in list(occurs[pivot] | occurs[-pivot]):
+            target = self.clauses[other]
+            if other == index or target is None or len(target) < len(codes):
+                continue
+            flipped = None
+            for code in codes:
+                if code in target:
+                    continue
+                if flipped is None and -code in target:
+                    flipped = code
+                else:
+                    break
+            else:
+                if flipped is None:
+                    self._remove(other)
+                    self.num_subsumed += 1
+                else:
+                    self._strengthen(other, -flipped)
+                    if self.unsat:
+                        return
+            if self.clauses[index] is None:
+                return
+
+    def _eliminate_pure(self):
+        changed = False
+        for var in sorted(self.variables):
+            if var in self.frozen or var in self.fixed or var in self.eliminated:
+                continue
+            positive, negative = self.occurs[var], self.occurs[-var]
+            if bool(positive) == bool(negative):
+                continue
+            lit = var if positive else -var
+            self.fixed[var] = lit
+            self.stack.append((lit, (lit,)))
+            for index in list(self.occurs[lit]):
+                self._remove(index)
+            self.num_pure += 1
+            changed = True
+        return changed
+
+    def _eliminate_variables(self):
+        occurs = self.occurs
+        candidates = [var for var in self.variables
+                      if var not in self.frozen and var not in self.fixed and var not in self.eliminated
+                      and occurs[var] and occurs[-var]
+                      and len(occurs[var]) + len(occurs[-var]) <= self.max_occurrences]
+        candidates.sort(key=lambda var: len(occurs[var]) * len(occurs[-var]))
+        changed = False
+        for var in candidates:
+            if self.unsat:
+                break
+            if self.units:
+                self._propagate()
+                if self.unsat or var in self.fixed:
+                    continue
+            positive, negative = list(occurs[var]), list(occurs[-var])
+            if not positive or not negative:
+                continue
+            limit = len(positive) + len(negative)
+            resolvents = []
+            for p in positive:
+                for n in negative:
+                    resolvent = self._resolve(self.clauses[p], self.clauses[n], var)
+                    if resolvent is None:
+                        continue
+                    resolvents.append(resolvent)
+                    if len(resolvents) > limit or len(resolvent) > self.max_resolvent:
+                        break
+                else:
+                    continue
+                break
+            else:
+                for index in positive:
+                    self.stack.append((var, tuple(self.clauses[index])))
+                for index in negative:
+                    self.stack.append((-var, tuple(self.clauses[index])))
+                for index in positive + negative:
+                    self._remove(index)
+                for resolvent in resolvents:
+                    index = self._add(resolvent)
+                    if index is not None:
+                        self.queue.add(index)
+                self.eliminated.add(var)
+                self.num_eliminated += 1
+                changed = True
+        return changed
+
+    @staticmethod
+    def _resolve(positive, negative, var):
+        """Returns the resolvent of two clauses on `var`, or None if it is a tautology."""
+        resolvent = set(positive)
+        resolvent.discard(var)
+        for code in negative:
+            if code == -var:
+                continue
+            if -code in resolvent:
+                return None
+            resolvent.add(code)
+        return resolvent
+
+
+def preprocess(sent, frozen=()):
+    """Simplifies a CNF sentence (see Preprocessor).
+
+    Returns
+    -------
+    Cnf, Preprocessor
+        the simplified sentence, and the preprocessor whose extend_model
+        turns models of it into models of `sent`
+    """
+
+    preprocessor = Preprocessor(sent, frozen)
+    return preprocessor.run(), preprocessor
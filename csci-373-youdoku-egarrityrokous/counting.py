@@ -0,0 +1,207 @@
+import cnf
+from cdcl import CdclSolver
+
+
+def iter_models(sent, variables=None):
+    """Lazily enumerates the models of a CNF sentence.
+
+    A single CdclSolver is kept for the whole enumeration. After each model
+    a clause blocking it is added to the solver, so the next call to solve
+    continues with everything learned so far instead of starting over.
+
+    Parameters
+    ----------
+    sent : Cnf
+        the CNF sentence
+    variables : iterable[int]
+        if given, models are only told apart by these variables: each model
+        yielded differs from the previous ones on at least one of them. This
+        is the cheap way to enumerate when the other variables are fixed by
+        these ones (e.g. the auxiliary variables of an encoding).
+
+    Yields
+    ------
+    dict[str, bool]
+        the models, each assigning every symbol of the sentence
+    """
+
+    occurring = sent.get_variables()
+    variables = sorted(occurring if variables is None else set(variables))
+    if not occurring.issuperset(variables):
+        raise ValueError("Models can only be told apart by variables of the sentence")
+    solver = CdclSolver(sent)
+    while True:
+        model = solver.solve()
+        if model is None:
+            return
+        yield model
+        if not variables:
+            return
+        solver.add_clause([-var if model[cnf.symbol_name(var)] else var for var in variables])
+
+
+def count_models(sent, limit=None):
+    """Counts the models of a CNF sentence over the symbols it contains.
+
+    With a limit the models are enumerated (see iter_models) and counting
+    stops as soon as `limit` of them have been found, so count_models(sent, 2)
+    is a cheap uniqueness test. Without a limit the exact count is computed
+    by count_components.
+
+    Parameters
+    ----------
+    sent : Cnf
+        the CNF sentence
+    limit : int
+        the most models to look for (None for no limit)
+
+    Returns
+    -------
+    int
+        the number of models, or `limit` if there are at least that many
+    """
+
+    if limit is None:
+        return count_components(sent)
+    count = 0
+    if limit > 0:
+        for _ in iter_models(sent):
+            count += 1
+            if count == limit:
+                break
+    return count
+
+
+def count_components(sent):
+    """Exact model counting (#SAT) with component decomposition and caching.
+
+    The counter assigns a variable, simplifies the clauses by unit
+    propagation and splits what is left into connected components (sets of
+    clauses that share no variables). The count of a formula is the product
+    of the counts of its components, times 2 for every variable that no
+    longer occurs, and each component's count is cached by its clauses, so
+    that the same subformula reached along different branches is only
+    counted once.
+
+    Parameters
+    ----------
+    sent : Cnf
+        the CNF sentence
+
+    Returns
+    -------
+    int
+        the number of models over the symbols of the sentence
+    """
+
+    clauses = set()
+    for clause in sent.get_clauses():
+        codes = clause.get_codes()
+        if not codes:
+            return 0
+        if not any(-code in codes for code in codes):
+            clauses.add(tuple(codes))
+    return _count(frozenset(clauses), len(sent.get_variables()), (), dict())
+
+
+def _count(clauses, num_vars, units, cache):
+    """Counts the models over num_vars variables of a set of clauses (tuples of
+    codes) conjoined with some unit literals."""
+    simplified = _simplify(clauses, units)
+    if simplified is None:
+        return 0
+    assigned, rest = simplified
+    count = 2 ** (num_vars - assigned - _num_occurring(rest))
+    for component in _components(rest):
+        count *= _count_component(component, cache)
+        if count == 0:
+            break
+    return count
+
+
+def _count_component(component, cache):
+    """Counts the models of a connected set of clauses over the variables it contains."""
+    if component in cache:
+        return cache[component]
+    occurrences = dict()
+    for clause in component:
+        for code in clause:
+            occurrences[abs(code)] = occurrences.get(abs(code), 0) + 1
+    var = max(occurrences, key=lambda var: (occurrences[var], -var))
+    num_vars = len(occurrences)
+    count = _count(component, num_vars, (var,), cache) + _count(component, num_vars, (-var,), cache)
+    cache[component] = count
+    return count
+
+
+def _simplify(clauses, units):
+    """Applies unit propagation to a set of clauses.
+
+    Returns
+    -------
+    int, frozenset[tuple[int]]
+        the number of variables assigned by propagation and the remaining
+        clauses, or None if propagation falsifies a clause
+    """
+
+    assigned = set()
+    pending = list(units)
+    for clause in clauses:
+        if len(clause) == 1:
+            pending.append(clause[0])
+    clauses = set(clauses)
+    while pending:
+        true_lits = set()
+        for lit in pending:
+            if -lit in true_lits or -lit in assigned:
+                return None
+            true_lits.add(lit)
+        assigned.update(true_lits)
+        pending = []
+        simplified = set()
+        for clause in clauses:
+            if any(code in true_lits for code in clause):
+                continue
+            reduced = tuple(code for code in clause if -code not in true_lits)
+            if not reduced:
+                return None
+            if len(reduced) == 1:
+                if -reduced[0] in assigned:
+                    return None
+                if reduced[0] not in assigned:
+                    pending.append(reduced[0])
+                continue
+            simplified.add(reduced)
+        clauses = simplified
+    return len(assigned), frozenset(clauses)
+
+
+def _num_occurring(clauses):
+    return len({abs(code) for clause in clauses for code in clause})
+
+
+def _components(clauses):
+    """Splits a set of clauses into its connected components (by shared variables)."""
+    parent = dict()
+
+    def find(var):
+        root = var
+        while parent[root] != root:
+            root = parent[root]
+        while parent[var] != root:
+            parent[var], var = root, parent[var]
+        return root
+
+    for clause in clauses:
+        first = abs(clause[0])
+        parent.setdefault(first, first)
+        for code in clause[1:]:
+            var = abs(code)
+            parent.setdefault(var, var)
+            a, b = find(first), find(var)
+            if a != b:
+                parent[b] = a
+    groups = dict()
+    for clause in clauses:
+        groups.setdefault(find(abs(clause[0])), []).append(clause)
+    return [frozenset(group) for group in groups.values()]
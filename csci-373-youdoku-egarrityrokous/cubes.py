@@ -0,0 +1,156 @@
+import cnf
+import multiprocessing
+import os
+from collections import defaultdict
+from cdcl import CdclSolver
+from dpll import Propagator
+
+
+def lookahead_cubes(sent, depth, candidates=16):
+    """Splits a sentence into cubes by lookahead.
+
+    A cube is a partial assignment, and the cubes together cover every
+    model of the sentence, so the sentence is satisfiable iff it is
+    satisfiable under one of the cubes. The cubes form a binary tree of at
+    most `depth` decisions. At each node the most frequent unassigned
+    variables are probed: both of their literals are propagated, and the
+    variable whose two branches imply the most literals (the product of the
+    two counts) is split on. Branches refuted by propagation yield no cube.
+
+    Parameters
+    ----------
+    sent : Cnf
+        the CNF sentence to split
+    depth : int
+        the largest number of decisions in a cube (at most 2**depth cubes)
+    candidates : int
+        the number of variables probed at each node
+
+    Returns
+    -------
+    list[list[int]]
+        the literal codes of each cube (no cubes if the sentence is refuted
+        by propagation alone)
+    """
+
+    propagator = Propagator(sent)
+    if propagator.propagate() is not None:
+        return []
+    occurrences = defaultdict(int)
+    for clause in propagator.clauses:
+        for lit in clause:
+            occurrences[abs(lit)] += 1
+    order = sorted(occurrences, key=lambda var: (-occurrences[var], var))
+    cubes = []
+    decisions = []
+
+    def probe(lit):
+        """Returns the number of literals implied by lit, or None if it is refuted."""
+        level = propagator.decision_level()
+        size = len(propagator.trail)
+        propagator.new_level()
+        propagator.enqueue(lit)
+        conflict = propagator.propagate()
+        implied = len(propagator.trail) - size
+        propagator.cancel_until(level)
+        return None if conflict is not None else implied
+
+    def pick():
+        best, best_score = None, -1
+        probed = 0
+        for var in order:
+            if propagator.values[var] != 0:
+                continue
+            positive, negative = probe(var), probe(-var)
+            if positive is None or negative is None:
+                return var
+            score = positive * negative
+            if score > best_score:
+                best, best_score = var, score
+            probed += 1
+            if probed == candidates:
+                break
+        return best
+
+    def split():
+        var = pick() if len(decisions) < depth else None
+        if var is None:
+            cubes.append(list(decisions))
+            return
+        level = propagator.decision_level()
+        for lit in (var, -var):
+            propagator.new_level()
+            propagator.enqueue(lit)
+            if propagator.propagate() is None:
+                decisions.append(lit)
+                split()
+                decisions.pop()
+            propagator.cancel_until(level)
+
+    split()
+    return cubes
+
+
+# The solver of each worker process, built once by _start_worker and reused
+# (with its learned clauses) for every cube the worker is given.
+_solver = None
+
+# Literal codes are only meaningful in the process that interned them, so
+# cubes travel to the workers as (symbol, polarity) pairs and are
+# re-interned there by _solve_cube.
+
+
+def _start_worker(sent):
+    global _solver
+    _solver = CdclSolver(sent)
+
+
+def _solve_cube(cube):
+    return _solver.solve([cnf.literal_code(symbol, polarity) for symbol, polarity in cube])
+
+
+def cube_and_conquer(sent, depth=None, workers=None, context=None):
+    """Solves a sentence by splitting it into cubes and solving them in parallel.
+
+    The cubes (see lookahead_cubes) are handed to a pool of worker
+    processes, each of which keeps one CdclSolver for the sentence and
+    solves its cubes under assumptions. The first satisfiable cube stops
+    the pool; the sentence is unsatisfiable only once every cube is.
+
+    Parameters
+    ----------
+    sent : Cnf
+        a CNF sentence for which we want to find a satisfying model
+    depth : int
+        the largest number of decisions per cube (defaults to enough cubes
+        for about 8 per worker)
+    workers : int
+        the number of worker processes (defaults to the number of CPUs)
+    context : multiprocessing context
+        the context the pool is created from (e.g.
+        multiprocessing.get_context('spawn')); defaults to multiprocessing's
+        default start method
+
+    Returns
+    -------
+    dict[str, bool]
+        a satisfying model (if one exists), otherwise None is returned
+    """
+
+    workers = workers or os.cpu_count() or 1
+    if depth is None:
+        depth = (8 * workers - 1).bit_length()
+    cubes = lookahead_cubes(sent, depth)
+    if not cubes:
+        return None
+    cubes = [[(cnf.symbol_name(lit), lit > 0) for lit in cube] for cube in cubes]
+    context = context or multiprocessing
+    pool = context.Pool(workers, initializer=_start_worker, initargs=(sent,))
+    try:
+        for model in pool.imap_unordered(_solve_cube, cubes):
+            if model is not None:
+                return model
+        return None
+    finally:
+        pool.terminate()
+        pool.join()
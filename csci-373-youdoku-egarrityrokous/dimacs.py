@@ -0,0 +1,118 @@
+import cnf
+from cnf import Clause, Cnf
+
+# Symbol given to DIMACS variable n when the file does not name it.
+DEFAULT_PREFIX = 'x'
+
+
+def iter_dimacs(stream):
+    """Streams the clauses of a DIMACS CNF file.
+
+    Comment lines ("c ..."), the problem line ("p cnf <vars> <clauses>") and
+    the "%" end marker used by the SATLIB benchmarks are skipped. A clause is
+    a sequence of nonzero integers terminated by 0 and may span several lines.
+
+    Parameters
+    ----------
+    stream : iterable[str]
+        the lines of the file (e.g. an open file object)
+
+    Yields
+    ------
+    list[int]
+        the DIMACS literals of each clause
+    """
+
+    clause = []
+    for line in stream:
+        line = line.strip()
+        if not line or line[0] in 'cp':
+            continue
+        if line[0] == '%':
+            break
+        for token in line.split():
+            lit = int(token)
+            if lit == 0:
+                yield clause
+                clause = []
+            else:
+                clause.append(lit)
+    if clause:
+        yield clause
+
+
+def read_dimacs(source, prefix=DEFAULT_PREFIX):
+    """Reads a DIMACS CNF file into a Cnf.
+
+    DIMACS variable n becomes the symbol prefix + str(n), unless the file
+    names it with a "c var <n> <symbol>" comment (as written by write_dimacs).
+
+    Parameters
+    ----------
+    source : str or iterable[str]
+        a file path, or the lines of the file
+    prefix : str
+        the symbol prefix for unnamed variables
+
+    Returns
+    -------
+    Cnf
+        the CNF sentence
+    """
+
+    if isinstance(source, str):
+        with open(source) as reader:
+            return read_dimacs(reader, prefix)
+    names = dict()
+    codes = dict()
+
+    def code(lit):
+        var = abs(lit)
+        if var not in codes:
+            codes[var] = cnf.intern_symbol(names.get(var, prefix + str(var)))
+        return codes[var] if lit > 0 else -codes[var]
+
+    def lines():
+        for line in source:
+            if line.startswith('c var '):
+                _, _, var, symbol = line.split(None, 3)
+                names[int(var)] = symbol.strip()
+            yield line
+
+    return Cnf([Clause.from_codes([code(lit) for lit in clause]) for clause in iter_dimacs(lines())])
+
+
+def write_dimacs(sent, stream, comments=()):
+    """Writes a Cnf in DIMACS CNF format.
+
+    Symbols are numbered in alphabetical order and each one is recorded in a
+    "c var <n> <symbol>" comment, so read_dimacs restores the original names.
+
+    Parameters
+    ----------
+    sent : Cnf
+        the CNF sentence
+    stream : file
+        a writable text stream
+    comments : iterable[str]
+        extra comment lines to write at the top of the file
+
+    Returns
+    -------
+    dict[str, int]
+        maps each symbol to its DIMACS variable number
+    """
+
+    symbols = sorted(sent.get_symbols())
+    numbers = {symbol: n for n, symbol in enumerate(symbols, start=1)}
+    dimacs = {cnf.lookup_variable(symbol): n for symbol, n in numbers.items()}
+    for comment in comments:
+        stream.write(f'c {comment}\n')
+    for symbol in symbols:
+        stream.write(f'c var {numbers[symbol]} {symbol}\n')
+    clauses = sent.get_clauses()
+    stream.write(f'p cnf {len(symbols)} {len(clauses)}\n')
+    for clause in sorted(clauses, key=str):
+        literals = [str(dimacs[code] if code > 0 else -dimacs[-code]) for code in clause.get_codes()]
+        stream.write(' '.join(literals + ['0']) + '\n')
+    return numbers
@@ -1,9 +1,10 @@
 import cnf
 from cnf import Clause, Literal, Cnf
-from util import SearchSpace, dfs
+from util import SearchSpace, SearchStats, dfs
 from random import shuffle
 from search import SatisfiabilitySearchSpace
 from collections import defaultdict
+from branching import make_heuristic, BranchingHeuristic
 
 def unit_resolve(unit_clauses, clause):
     """Resolves a clause with a set of unit clauses.
@@ -92,27 +93,223 @@ def unit_resolution(unit_clauses, regular_clauses):
         #if len(regular_clauses) == 0: #if there are possible unit resolutions, unsatisfiable
             #regular_clauses.add(cnf.c('FALSE'))
     return unit_clauses, regular_clauses
+
+
+class Propagator:
+    """Unit propagation over a CNF sentence using two watched literals.
+
+    Clauses are stored as lists of signed literal codes (see cnf.intern_symbol).
+    Each clause of length two or more watches its first two literals, and
+    self.watches[lit] lists the indices of the clauses watching literal lit.
+    Both self.watches and self.values are indexed directly by literal code,
+    relying on Python's negative indexing: they have 2n + 1 slots for n
+    variables, so positive codes use the front and negative codes the back.
+    When a literal becomes false only the clauses watching it are visited,
+    so the cost of propagation grows with the clauses touched rather than
+    with the size of the sentence.
+
+    Assignments are kept on a trail, split into decision levels by
+    self.trail_lim, so that they can be undone by backtracking.
+    """
+
+    def __init__(self, sent):
+        """
+        Parameters
+        ----------
+        sent : Cnf
+            the CNF sentence to propagate over
+        """
+
+        variables = sent.get_variables()
+        self.num_vars = num_vars = max(variables) if variables else 0
+        self.values = [0] * (2 * num_vars + 1)
+        self.levels = [0] * (num_vars + 1)
+        self.reasons = [None] * (num_vars + 1)
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.clauses = []
+        self.watches = [[] for _ in range(2 * num_vars + 1)]
+        self.conflict = None
+        for clause in sorted(sent.get_clauses(), key=lambda clause: clause.codes.tobytes()):
+            self.add_clause(list(clause.get_codes()))
+
+    def value(self, lit):
+        """Returns 1 if the literal is true, -1 if it is false and 0 if unassigned."""
+        return self.values[lit]
+
+    def decision_level(self):
+        """Returns the current decision level."""
+        return len(self.trail_lim)
+
+    def add_clause(self, codes):
+        """Adds a clause (a list of literal codes) and returns its index.
+
+        The first two literals of the clause become its watches. A unit clause
+        is enqueued immediately and an empty clause marks the sentence as
+        permanently conflicting.
+        """
+
+        index = len(self.clauses)
+        self.clauses.append(codes)
+        if len(codes) == 0:
+            self.conflict = index
+        elif len(codes) == 1:
+            if not self.enqueue(codes[0], index):
+                self.conflict = index
+        else:
+            self.watches[codes[0]].append(index)
+            self.watches[codes[1]].append(index)
+        return index
+
+    def enqueue(self, lit, reason=None):
+        """Assigns a literal true at the current decision level.
+
+        Returns
+        -------
+        bool
+            False iff the literal is already false
+        """
+
+        value = self.values[lit]
+        if value != 0:
+            return value > 0
+        var = abs(lit)
+        self.values[lit] = 1
+        self.values[-lit] = -1
+        self.levels[var] = len(self.trail_lim)
+        self.reasons[var] = reason
+        self.trail.append(lit)
+        return True
+
+    def new_level(self):
+        """Opens a new decision level."""
+        self.trail_lim.append(len(self.trail))
+
+    def cancel_until(self, level):
+        """Undoes every assignment made above the given decision level."""
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        values, reasons = self.values, self.reasons
+        for lit in self.trail[start:]:
+            values[lit] = 0
+            values[-lit] = 0
+            reasons[abs(lit)] = None
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = min(self.qhead, start)
+
+    def compact(self, keep):
+        """Drops every clause whose index is not in `keep` and rebuilds the watches.
+
+        This must only be called at decision level 0 once propagation has
+        reached a fixpoint, since clause indices (and therefore reasons) change.
+
+        Parameters
+        ----------
+        keep : set[int]
+            the indices of the clauses to keep
+
+        Returns
+        -------
+        dict[int, int]
+            maps the old index of each kept clause to its new index
+        """
+
+        remap = dict()
+        clauses = []
+        for index, clause in enumerate(self.clauses):
+            if index in keep:
+                remap[index] = len(clauses)
+                clauses.append(clause)
+        self.clauses = clauses
+        self.watches = [[] for _ in range(2 * self.num_vars + 1)]
+        for index, clause in enumerate(clauses):
+            if len(clause) > 1:
+                self.watches[clause[0]].append(index)
+                self.watches[clause[1]].append(index)
+        for lit in self.trail:
+            self.reasons[abs(lit)] = None
+        if self.conflict is not None:
+            self.conflict = remap.get(self.conflict, self.conflict)
+        return remap
+
+    def propagate(self):
+        """Propagates all enqueued assignments to a fixpoint.
+
+        Returns
+        -------
+        int
+            the index of a falsified clause, or None if there is no conflict
+        """
+
+        if self.conflict is not None:
+            return self.conflict
+        trail, clauses, watches, values = self.trail, self.clauses, self.watches, self.values
+        levels, reasons, level = self.levels, self.reasons, len(self.trail_lim)
+        while self.qhead < len(trail):
+            false_lit = -trail[self.qhead]
+            self.qhead += 1
+            watchers = watches[false_lit]
+            kept = []
+            for position, index in enumerate(watchers):
+                clause = clauses[index]
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                first_value = values[first]
+                if first_value == 1:
+                    kept.append(index)
+                    continue
+                for k in range(2, len(clause)):
+                    other = clause[k]
+                    if values[other] != -1:
+                        clause[1], clause[k] = other, false_lit
+                        watches[other].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if first_value == -1:
+                        kept.extend(watchers[position + 1:])
+                        watches[false_lit] = kept
+                        self.qhead = len(trail)
+                        if not self.trail_lim:
+                            self.conflict = index
+                        return index
+                    values[first] = 1
+                    values[-first] = -1
+                    levels[abs(first)] = level
+                    reasons[abs(first)] = index
+                    trail.append(first)
+            watches[false_lit] = kept
+        return None
+
+
 class DpllSearchSpace(SatisfiabilitySearchSpace):
     """A search space for the DPLL algorithm."""
 
-    def __init__(self, sent):
+    def __init__(self, sent, heuristic=None):
         """
         Parameters
         ----------
         sent : Cnf
             a CNF sentence for which we want to find a satisfying model
+        heuristic : str or BranchingHeuristic
+            if given, the next symbol is chosen by this branching heuristic
+            (see branching.py) instead of alphabetically, and literals implied
+            by unit resolution are added to the successor all at once
 
         """
 
         super().__init__(sent)
-        unit_clauses = set()
-        regular_clauses = set()
-        for clause in sent.clauses:
-            if len(clause) == 1:
-                unit_clauses.add(clause)
-            else:
-                regular_clauses.add(clause)
-        self.unit_clauses, self.regular_clauses = unit_resolution(unit_clauses, regular_clauses)
+        self.heuristic = make_heuristic(heuristic, sent)
+        self.propagator = Propagator(sent)
+        self.propagator.propagate()
+        # the literal codes of the state the propagator currently holds, one
+        # decision level per literal; successive DFS states share a prefix
+        # with it, so only the differing suffix has to be undone and redone
+        self.decisions = []
 
     def get_successors(self, state):
         """Computes the successors of a DPLL search state.
@@ -152,34 +349,182 @@ class DpllSearchSpace(SatisfiabilitySearchSpace):
         list[tuple[Literal]]
             The successor states.
         """
-        stateClauses = set([Clause([literal]) for literal in state])
-        unit_clauses = self.unit_clauses | stateClauses #all unit clauses
-        #update unit and regular clause variables for this next state
-        unit_clauses, regular_clauses = unit_resolution(unit_clauses, self.regular_clauses)
-        if (cnf.c("FALSE")) in regular_clauses:
+        propagator = self.propagator
+        if propagator.conflict is not None or len(state) == len(self.signature):
             return []
-        #next_literal = Literal(self.signature[len(state)])
-        #if next_literal.negate() in unit_clauses:
-            #print("hello2")
-            #return tuple(list(state) + [next_literal.negate()])
-        #if next_literal in unit_clauses:
-            #print("ho ho2")
-            #return tuple(list(state) + [next_literal])
-        result = []
+        decisions = self.decisions
+        shared = 0
+        limit = min(len(state), len(decisions))
+        while shared < limit and state[shared].code == decisions[shared]:
+            shared += 1
+        self._backtrack(shared)
+        del decisions[shared:]
+        for literal in state[shared:]:
+            propagator.new_level()
+            decisions.append(literal.code)
+            if not propagator.enqueue(literal.code):
+                conflict = None
+            else:
+                conflict = propagator.propagate()
+                if conflict is None:
+                    continue
+            if self.heuristic is not None and conflict is not None:
+                self.heuristic.on_conflict(propagator.clauses[conflict])
+            decisions.pop()
+            self._backtrack(len(decisions))
+            return []
+        if self.heuristic is not None:
+            return self._heuristic_successors(state)
         successor = self.signature[len(state)]
-        next_literal = None
-        for clause in unit_clauses:
-            if successor == clause.get_literals()[0].get_symbol():
-                next_literal = clause.get_literals()[0]
-        if next_literal is not None:
-            result.append(state + tuple([next_literal]))
-        else:
-            for value in [False, True]:
-                next_literal = Literal(successor, value)
-                result.append(state + tuple([next_literal]))
-        return result
+        value = propagator.value(cnf.literal_code(successor))
+        if value != 0:
+            return [state + (Literal(successor, value > 0),)]
+        return [state + (Literal(successor, False),), state + (Literal(successor, True),)]
+
+    def _heuristic_successors(self, state):
+        propagator = self.propagator
+        in_state = {literal.code for literal in state}
+        implied = tuple(Literal.from_code(lit) for lit in propagator.trail if lit not in in_state)
+        lit = self.heuristic.pick(propagator)
+        if lit is None:
+            return [state + implied] if implied else []
+        return [state + implied + (Literal.from_code(-lit),),
+                state + implied + (Literal.from_code(lit),)]
+
+    def _backtrack(self, level):
+        propagator = self.propagator
+        if self.heuristic is not None and propagator.decision_level() > level:
+            self.heuristic.on_unassign(propagator.trail[propagator.trail_lim[level]:])
+        propagator.cancel_until(level)
+
+
+class DpllSolver:
+    """DPLL search over a single mutable assignment trail.
+
+    This explores the same tree as running dfs on a DpllSearchSpace (symbols
+    in alphabetical order, positive polarity first), but instead of copying
+    a tuple of literals per search node it keeps one trail in a Propagator,
+    opening a decision level per branch and undoing it on backtrack. The
+    work per node is the propagation of the new implications, and memory is
+    proportional to the number of variables rather than to depth squared.
+
+    A branching heuristic (see branching.py) can replace the alphabetical
+    order; it is then told about every conflict and every undone literal.
+    """
 
-def dpll(sent):
+    def __init__(self, sent, heuristic=None, stats=None):
+        """
+        Parameters
+        ----------
+        sent : Cnf
+            a CNF sentence for which we want to find a satisfying model
+        heuristic : str or BranchingHeuristic
+            the branching heuristic, or None for alphabetical order
+        stats : stats.SolverStats
+            if given, the search counters and the time spent propagating are
+            added to it, and its callback is told about every decision,
+            conflict and backtrack
+        """
+
+        self.heuristic = make_heuristic(heuristic, sent)
+        self.propagator = Propagator(sent)
+        self.order = sorted(sent.get_variables(), key=cnf.symbol_name)
+        self.stats = stats
+        self.num_nodes = 0
+        self.num_decisions = 0
+        self.num_propagations = 0
+        self.num_conflicts = 0
+        self.num_backtracks = 0
+        self.max_depth = 0
+
+    def solve(self):
+        """Searches for a satisfying model.
+
+        Returns
+        -------
+        dict[str, bool]
+            a satisfying model (if one exists), otherwise None is returned
+        """
+
+        stats = self.stats
+        if stats is None:
+            return self._search(self.propagator.propagate, None)
+        decisions, propagations = self.num_decisions, self.num_propagations
+        conflicts, backtracks = self.num_conflicts, self.num_backtracks
+        with stats.phase('searching'):
+            propagate = stats.timed('propagating', self.propagator.propagate)
+            notify = stats.emit if stats.callback is not None else None
+            model = self._search(propagate, notify)
+        stats.decisions += self.num_decisions - decisions
+        stats.propagations += self.num_propagations - propagations
+        stats.conflicts += self.num_conflicts - conflicts
+        stats.backtracks += self.num_backtracks - backtracks
+        stats.max_depth = max(stats.max_depth, self.max_depth)
+        stats.emit('done', result=model is not None)
+        return model
+
+    def _search(self, propagate, notify):
+        propagator = self.propagator
+        trail = propagator.trail
+        size = len(trail)
+        conflict = propagate()
+        self.num_propagations += len(trail) - size
+        if conflict is not None:
+            self.num_conflicts += 1
+            return None
+        order, heuristic = self.order, self.heuristic
+        # one entry (literal, position in self.order, flipped) per decision level
+        decisions = []
+        position = 0
+        while True:
+            if heuristic is not None:
+                lit = heuristic.pick(propagator)
+                if lit is None:
+                    return cnf.model_from_codes(trail)
+            else:
+                while position < len(order) and propagator.values[order[position]] != 0:
+                    position += 1
+                if position == len(order):
+                    return cnf.model_from_codes(trail)
+                lit = order[position]
+            self.num_nodes += 1
+            self.num_decisions += 1
+            if notify is not None:
+                notify('decision', lit=lit)
+            propagator.new_level()
+            propagator.enqueue(lit)
+            decisions.append((lit, position, False))
+            if len(decisions) > self.max_depth:
+                self.max_depth = len(decisions)
+            while True:
+                size = len(trail)
+                conflict = propagate()
+                self.num_propagations += len(trail) - size
+                if conflict is None:
+                    break
+                self.num_conflicts += 1
+                if notify is not None:
+                    notify('conflict')
+                if heuristic is not None:
+                    heuristic.on_conflict(propagator.clauses[conflict])
+                while decisions and decisions[-1][2]:
+                    decisions.pop()
+                if not decisions:
+                    return None
+                lit, position, _ = decisions.pop()
+                if heuristic is not None:
+                    heuristic.on_unassign(trail[propagator.trail_lim[len(decisions)]:])
+                propagator.cancel_until(len(decisions))
+                self.num_backtracks += 1
+                if notify is not None:
+                    notify('backtrack')
+                self.num_nodes += 1
+                propagator.new_level()
+                propagator.enqueue(-lit)
+                decisions.append((-lit, position, True))
+
+
+def dpll(sent, search='trail', heuristic=None, preprocess=False, stats=None):
     """An implementation of the DPLL algorithm for satisfiability.
 
     This function will only work once DpllSearchSpace is correctly implemented.
@@ -188,6 +533,20 @@ def dpll(sent):
     ----------
     sent : cnf.Sentence
         the CNF sentence for which we want to find a satisfying model.
+    search : str
+        'trail' runs the DpllSolver loop over a single assignment trail;
+        'dfs' runs util.dfs over a DpllSearchSpace
+    heuristic : str or BranchingHeuristic
+        the branching heuristic: None (alphabetical order), 'vsids', 'dlis',
+        'moms', 'cell' (Sudoku most-constrained cell), or an instance of
+        branching.BranchingHeuristic built for `sent`
+    preprocess : bool
+        if True, `sent` is first simplified by cnf.preprocess and the model
+        found for the simplified sentence is extended back to `sent` (the
+        heuristic must then be given by name)
+    stats : stats.SolverStats
+        if given, the search counters and the time spent preprocessing,
+        searching and propagating are added to it
 
     Returns
     -------
@@ -195,7 +554,26 @@ def dpll(sent):
         a satisfying model (if one exists), otherwise None is returned
     """
 
-    search_space = DpllSearchSpace(sent)
-    state, _ = dfs(search_space)
+    if search not in ('trail', 'dfs'):
+        raise ValueError(f"Unknown DPLL search mode: {search}")
+    if preprocess:
+        if isinstance(heuristic, BranchingHeuristic):
+            raise ValueError("A preprocessed sentence needs a heuristic given by name")
+        if stats is None:
+            simplified, preprocessor = cnf.preprocess(sent)
+        else:
+            with stats.phase('preprocessing'):
+                simplified, preprocessor = cnf.preprocess(sent)
+        model = dpll(simplified, search, heuristic, stats=stats)
+        return preprocessor.extend_model(model) if model is not None else None
+    if search == 'trail':
+        return DpllSolver(sent, heuristic, stats).solve()
+    search_space = DpllSearchSpace(sent, heuristic)
+    if stats is None:
+        state, _ = dfs(search_space)
+    else:
+        search_stats = SearchStats()
+        state, _ = dfs(search_space, stats=search_stats, timed=True)
+        stats.add_search(search_stats, state is not None)
     model = {lit.get_symbol(): lit.get_polarity() for lit in state} if state is not None else None
     return model
@@ -0,0 +1,219 @@
+import cnf
+import random
+import time
+
+
+class LocalSearch:
+    """Stochastic local search for satisfiability (WalkSAT and ProbSAT).
+
+    The search starts from a random complete assignment and repeatedly
+    picks a falsified clause and flips one of its variables, until no
+    clause is falsified or the budget runs out. It cannot prove that a
+    sentence is unsatisfiable, but often finds models of large satisfiable
+    sentences much faster than a complete search.
+
+    Variables are renumbered 1 to n, and every array is indexed directly
+    by variable or by literal code (2n + 1 slots, negative codes at the
+    back, as in dpll.Propagator). For each clause the number of true
+    literals is kept, and for each variable its break count (clauses that
+    flipping it would falsify) and make count (falsified clauses that
+    flipping it would satisfy). A flip only visits the clauses of the
+    flipped variable, and updates these counts incrementally.
+    """
+
+    def __init__(self, sent, seed=None):
+        """
+        Parameters
+        ----------
+        sent : Cnf
+            a CNF sentence for which we want to find a satisfying model
+        seed : int
+            the random seed (None for a random one)
+        """
+
+        self.rng = random.Random(seed)
+        self.variables = sorted(sent.get_variables())
+        local = {var: i for i, var in enumerate(self.variables, start=1)}
+        n = len(self.variables)
+        self.clauses = []
+        self.has_empty_clause = False
+        for clause in sent.get_clauses():
+            codes = clause.get_codes()
+            if not codes:
+                self.has_empty_clause = True
+            elif not any(-code in codes for code in codes):
+                self.clauses.append([local[code] if code > 0 else -local[-code] for code in codes])
+        self.occurs = [[] for _ in range(2 * n + 1)]
+        for index, clause in enumerate(self.clauses):
+            for lit in clause:
+                self.occurs[lit].append(index)
+        self.num_flips = 0
+        self.restart()
+
+    def restart(self):
+        """Starts again from a fresh random assignment."""
+        n = len(self.variables)
+        rng = self.rng
+        self.values = [False] + [rng.random() < 0.5 for _ in range(n)]
+        self.num_true = [0] * len(self.clauses)
+        self.critical = [0] * len(self.clauses)
+        self.breaks = [0] * (n + 1)
+        self.makes = [0] * (n + 1)
+        self.unsat = []
+        self.unsat_position = [-1] * len(self.clauses)
+        values = self.values
+        for index, clause in enumerate(self.clauses):
+            true_lits = [lit for lit in clause if values[abs(lit)] == (lit > 0)]
+            self.num_true[index] = len(true_lits)
+            if not true_lits:
+                self._add_unsat(index)
+                for lit in clause:
+                    self.makes[abs(lit)] += 1
+            elif len(true_lits) == 1:
+                self.critical[index] = abs(true_lits[0])
+                self.breaks[abs(true_lits[0])] += 1
+
+    def _add_unsat(self, index):
+        self.unsat_position[index] = len(self.unsat)
+        self.unsat.append(index)
+
+    def _remove_unsat(self, index):
+        position = self.unsat_position[index]
+        last = self.unsat.pop()
+        if last != index:
+            self.unsat[position] = last
+            self.unsat_position[last] = position
+        self.unsat_position[index] = -1
+
+    def flip(self, var):
+        """Flips a variable, updating the true-literal, break and make counts."""
+        values, clauses = self.values, self.clauses
+        num_true, critical = self.num_true, self.critical
+        breaks, makes = self.breaks, self.makes
+        values[var] = not values[var]
+        true_lit = var if values[var] else -var
+        for index in self.occurs[true_lit]:
+            num_true[index] += 1
+            if num_true[index] == 1:
+                self._remove_unsat(index)
+                for lit in clauses[index]:
+                    makes[abs(lit)] -= 1
+                breaks[var] += 1
+                critical[index] = var
+            elif num_true[index] == 2:
+                breaks[critical[index]] -= 1
+        for index in self.occurs[-true_lit]:
+            num_true[index] -= 1
+            if num_true[index] == 0:
+                self._add_unsat(index)
+                for lit in clauses[index]:
+                    makes[abs(lit)] += 1
+                breaks[var] -= 1
+            elif num_true[index] == 1:
+                for lit in clauses[index]:
+                    if values[abs(lit)] == (lit > 0):
+                        critical[index] = abs(lit)
+                        breaks[abs(lit)] += 1
+                        break
+        self.num_flips += 1
+
+    def model(self):
+        """Returns the current assignment as a model dictionary."""
+        return {cnf.symbol_name(var): self.values[i]
+                for i, var in enumerate(self.variables, start=1)}
+
+    def walksat(self, noise=0.5):
+        """Picks the variable to flip in a random falsified clause, WalkSAT style.
+
+        A variable with a break count of zero is flipped if there is one.
+        Otherwise, with probability `noise` a random variable of the clause
+        is flipped, and else one with the smallest break count.
+        """
+        clause = self.clauses[self.rng.choice(self.unsat)]
+        breaks = self.breaks
+        best, best_break = None, None
+        for lit in clause:
+            var = abs(lit)
+            if best_break is None or breaks[var] < best_break:
+                best, best_break = var, breaks[var]
+        if best_break > 0 and self.rng.random() < noise:
+            return abs(self.rng.choice(clause))
+        return best
+
+    def probsat(self, cb=2.3, eps=1.0):
+        """Picks the variable to flip in a random falsified clause, ProbSAT style.
+
+        Each variable of the clause is chosen with probability proportional
+        to (eps + break)^-cb, so variables that would falsify few other
+        clauses are preferred without ever excluding the others.
+        """
+        clause = self.clauses[self.rng.choice(self.unsat)]
+        breaks = self.breaks
+        weights = [(eps + breaks[abs(lit)]) ** -cb for lit in clause]
+        return abs(self.rng.choices(clause, weights)[0])
+
+    def solve(self, method='walksat', max_flips=100000, max_seconds=None, max_tries=1, **options):
+        """Runs local search until a model is found or the budget runs out.
+
+        Parameters
+        ----------
+        method : str
+            'walksat' or 'probsat'
+        max_flips : int
+            the number of flips per try
+        max_seconds : float
+            if given, the search gives up after about this many seconds
+        max_tries : int
+            the number of tries, each from a fresh random assignment
+        options
+            passed on to the pick rule (noise for walksat, cb and eps for
+            probsat)
+
+        Returns
+        -------
+        dict[str, bool]
+            a satisfying model, or None if none was found within the budget
+        """
+
+        if method not in ('walksat', 'probsat'):
+            raise ValueError(f"Unknown local search method: {method}")
+        if self.has_empty_clause:
+            return None
+        pick = getattr(self, method)
+        deadline = None if max_seconds is None else time.perf_counter() + max_seconds
+        for attempt in range(max_tries):
+            if attempt > 0:
+                self.restart()
+            for flips in range(max_flips):
+                if not self.unsat:
+                    return self.model()
+                if deadline is not None and flips % 1000 == 0 and time.perf_counter() > deadline:
+                    return None
+                self.flip(pick(**options))
+            if not self.unsat:
+                return self.model()
+        return None
+
+
+def walksat(sent, max_flips=100000, max_seconds=None, noise=0.5, seed=None):
+    """Searches for a model with WalkSAT (see LocalSearch).
+
+    Returns
+    -------
+    dict[str, bool]
+        a satisfying model, or None if none was found within the budget
+    """
+
+    return LocalSearch(sent, seed).solve('walksat', max_flips, max_seconds, noise=noise)
+
+
+def probsat(sent, max_flips=100000, max_seconds=None, cb=2.3, eps=1.0, seed=None):
+    """Searches for a model with ProbSAT (see LocalSearch).
+
+    Returns
+    -------
+    dict[str, bool]
+        a satisfying model, or None if none was found within the budget
+    """
+
+    return LocalSearch(sent, seed).solve('probsat', max_flips, max_seconds, cb=cb, eps=eps)
@@ -10,6 +10,7 @@ import inspect
 import math
 import sys
 import time
+from collections import OrderedDict
 
 # Version information
 
@@ -121,6 +122,8 @@ class GWindow(object):
         self.setWindowTitle(getProgramName())
         self.eventLoopStarted = False
         self.active = True
+        self.updateDepth = 0
+        self.rebuildPending = False
         if not spyderFlag:
             atexit.register(self.startEventLoop)
 
@@ -311,16 +314,57 @@ class GWindow(object):
         if not self.eventLoopStarted:
             self.eventLoop()
 
+# Public method: beginUpdate
+
+    def beginUpdate(self):
+        """
+        Starts a batch of changes to the window.  Until the matching call
+        to <code>endUpdate</code>, changes that require the whole canvas
+        to be rebuilt (such as moving a <code>GCompound</code>) are
+        coalesced into a single rebuild at the end of the batch.  Every
+        event and timer callback runs inside such a batch.
+        """
+        self.updateDepth += 1
+
+# Public method: endUpdate
+
+    def endUpdate(self):
+        """
+        Ends a batch of changes started by <code>beginUpdate</code>,
+        rebuilding the canvas once if any change in the batch required it.
+        """
+        self.updateDepth -= 1
+        if self.updateDepth == 0 and self.rebuildPending:
+            self._rebuild()
+
 # Private method: _rebuild
 
     def _rebuild(self):
         """
         Rebuilds the tkinter data structure for the window.  This
-        operation is triggered if a global update is necessary.
+        operation is triggered if a global update is necessary.  Inside
+        a batch (see <code>beginUpdate</code>) it is deferred to the end.
         """
+        if self.updateDepth > 0:
+            self.rebuildPending = True
+            return
+        self.rebuildPending = False
         self.canvas.delete("all")
         self.base._install(self, SimpleTransform())
 
+# Private method: _dispatch
+
+    def _dispatch(self, listeners, e):
+        """
+        Calls each listener with the event inside a single batch.
+        """
+        self.beginUpdate()
+        try:
+            for fn in listeners:
+                fn(e)
+        finally:
+            self.endUpdate()
+
 # Class: GObject
 
 class GObject(object):
@@ -385,6 +429,7 @@ class GObject(object):
             x, y = x.x, x.y
         self.x = x
         self.y = y
+        self._boundsChanged()
         self._updateLocation()
 
 # Public method: move
@@ -683,6 +728,37 @@ class GObject(object):
         else:
             self.updateProperties(state=tkinter.HIDDEN)
 
+# Private method: _boundsChanged
+
+    def _boundsChanged(self):
+        """
+        Discards the hit-test indices of the compounds containing this
+        object, whose bounds have changed.
+        """
+        gobj = self.parent
+        while gobj is not None:
+            gobj.hitIndex = None
+            gobj = gobj.parent
+
+# Private method: _canvasItems
+
+    def _canvasItems(self):
+        """
+        Returns the tkinter canvas items drawing this object, from back
+        to front.
+        """
+        return [ ] if self.tkid is None else [ self.tkid ]
+
+# Private method: _uninstall
+
+    def _uninstall(self, tkc):
+        """
+        Deletes the canvas items drawing this object.
+        """
+        if self.tkid is not None:
+            tkc.delete(self.tkid)
+            self.tkid = None
+
 # Private method: getWindow
 
     def getWindow(self):
@@ -824,6 +900,7 @@ class GRect(GFillableObject):
             width, height = width.getWidth(), width.getHeight()
         self.width = width
         self.height = height
+        self._boundsChanged()
         gw = self.getWindow()
         if gw is None:
             return
@@ -930,6 +1007,7 @@ class GOval(GFillableObject):
             width, height = width.getWidth(), width.getHeight()
         self.width = width
         self.height = height
+        self._boundsChanged()
         gw = self.getWindow()
         if gw is None:
             return
@@ -1007,8 +1085,20 @@ class GCompound(GObject):
     manipulated as a unit.  The <code>GCompound</code> keeps track
     of its own position, and all items within it are drawn relative
     to that location.
+
+    Adding or removing an object only creates or deletes the canvas
+    items of that object.  A compound with many objects keeps a grid
+    index of their bounds, so that <code>getElementAt</code> only tests
+    the objects near the point.
     """
 
+# Constants
+
+    INDEX_THRESHOLD = 16
+    INDEX_CELL_SIZE = 64
+    INDEX_MAX_CELLS = 256
+    INDEX_MARGIN = 4
+
 # Constructor: GCompound
 
     def __init__(self):
@@ -1017,6 +1107,7 @@ class GCompound(GObject):
         """
         GObject.__init__(self)
         self.contents = [ ]
+        self.hitIndex = None
 
 # Public method: add
 
@@ -1031,12 +1122,10 @@ class GCompound(GObject):
             gobj.setLocation(x, y)
         self.contents.append(gobj)
         gobj.parent = self
-        if self.gw is None:
-            gw = self.getWindow()
-            if gw is not None:
-                gw._rebuild()
-        else:
-            gobj._install(self.gw, SimpleTransform())
+        gobj._boundsChanged()
+        gw = self.getWindow()
+        if gw is not None:
+            self._installAt(gw, len(self.contents) - 1)
 
 # Public method: remove
 
@@ -1046,10 +1135,10 @@ class GCompound(GObject):
         """
         index = self.findGObject(gobj)
         if index != -1:
+            gw = self.getWindow()
+            if gw is not None:
+                gobj._uninstall(gw.canvas)
             self.removeAt(index)
-        gw = self.getWindow()
-        if gw is not None:
-            gw._rebuild()
 
 # Public method: removeAll
 
@@ -1057,11 +1146,11 @@ class GCompound(GObject):
         """
         Removes all graphical objects from the <code>GCompound</code>.
         """
+        gw = self.getWindow()
         while (len(self.contents) > 0):
+            if gw is not None:
+                self.contents[0]._uninstall(gw.canvas)
             self.removeAt(0)
-        gw = self.getWindow()
-        if gw is not None:
-            gw._rebuild()
 
 # Public method: getElementAt
 
@@ -1071,7 +1160,17 @@ class GCompound(GObject):
         point (x, y), or <code>None</code> if no such object exists.
         Coordinates are interpreted relative to the reference point.
         """
-        for gobj in reversed(self.contents):
+        if len(self.contents) < self.INDEX_THRESHOLD:
+            candidates = range(len(self.contents))
+        else:
+            if self.hitIndex is None:
+                self._buildIndex()
+            cells, everywhere = self.hitIndex
+            size = self.INDEX_CELL_SIZE
+            cell = (math.floor(x / size), math.floor(y / size))
+            candidates = sorted(cells.get(cell, [ ]) + everywhere)
+        for i in reversed(candidates):
+            gobj = self.contents[i]
             if gobj.contains(x, y):
                 return gobj
         return None
@@ -1175,6 +1274,7 @@ class GCompound(GObject):
         if index != len(self.contents) - 1:
             self.contents.pop(index)
             self.contents.insert(index + 1, gobj)
+            self.hitIndex = None
             gw = self.getWindow()
             if gw is not None:
                 gw._rebuild()
@@ -1188,6 +1288,7 @@ class GCompound(GObject):
         if index != len(self.contents) - 1:
             self.contents.pop(index)
             self.contents.append(gobj)
+            self.hitIndex = None
             gw = self.getWindow()
             if gw is not None:
                 gw._rebuild()
@@ -1201,6 +1302,7 @@ class GCompound(GObject):
         if index != 0:
             self.contents.pop(index)
             self.contents.insert(index - 1, gobj)
+            self.hitIndex = None
             gw = self.getWindow()
             if gw is not None:
                 gw._rebuild()
@@ -1214,6 +1316,7 @@ class GCompound(GObject):
         if index != 0:
             self.contents.pop(index)
             self.contents.insert(0, gobj)
+            self.hitIndex = None
             gw = self.getWindow()
             if gw is not None:
                 gw._rebuild()
@@ -1231,9 +1334,91 @@ class GCompound(GObject):
 
     def removeAt(self, index):
         gobj = self.contents[index]
+        gobj._boundsChanged()
         self.contents.pop(index)
         gobj.parent = None
 
+# Internal method: _buildIndex
+
+    def _buildIndex(self):
+        """
+        Builds the hit-test index: a map from each grid cell to the
+        positions in <code>contents</code> of the objects whose bounds
+        (widened by a margin for line tolerances) overlap the cell.
+        Objects covering too many cells are listed as everywhere.
+        """
+        size = self.INDEX_CELL_SIZE
+        margin = self.INDEX_MARGIN
+        cells = { }
+        everywhere = [ ]
+        for i, gobj in enumerate(self.contents):
+            bounds = gobj.getBounds()
+            if bounds is None:
+                continue
+            x0 = math.floor((bounds.getX() - margin) / size)
+            y0 = math.floor((bounds.getY() - margin) / size)
+            x1 = math.floor((bounds.getX() + bounds.getWidth() + margin) / size)
+            y1 = math.floor((bounds.getY() + bounds.getHeight() + margin) / size)
+            if (x1 - x0 + 1) * (y1 - y0 + 1) > self.INDEX_MAX_CELLS:
+                everywhere.append(i)
+                continue
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    cells.setdefault((cx, cy), [ ]).append(i)
+        self.hitIndex = (cells, everywhere)
+
+# Internal method: _installAt
+
+    def _installAt(self, gw, index):
+        """
+        Creates the canvas items of the object at the given position of
+        <code>contents</code> and stacks them below the items of every
+        object drawn after it, leaving the rest of the canvas alone.
+        """
+        x = 0
+        y = 0
+        gobj = self
+        while gobj is not None:
+            x += gobj.x
+            y += gobj.y
+            gobj = gobj.parent
+        gobj = self.contents[index]
+        gobj._install(gw, SimpleTransform(x, y))
+        above = self._findItemAbove(index)
+        if above is not None:
+            for item in gobj._canvasItems():
+                gw.canvas.tag_lower(item, above)
+
+# Internal method: _findItemAbove
+
+    def _findItemAbove(self, index):
+        """
+        Returns the lowest canvas item drawn above the object at the given
+        position of <code>contents</code>, or <code>None</code> if the
+        object is on top of the window.
+        """
+        for gobj in self.contents[index + 1:]:
+            items = gobj._canvasItems()
+            if len(items) > 0:
+                return items[0]
+        if self.parent is None:
+            return None
+        return self.parent._findItemAbove(self.parent.findGObject(self))
+
+# Override method: _canvasItems
+
+    def _canvasItems(self):
+        items = [ ]
+        for gobj in self.contents:
+            items.extend(gobj._canvasItems())
+        return items
+
+# Override method: _uninstall
+
+    def _uninstall(self, tkc):
+        for gobj in self.contents:
+            gobj._uninstall(tkc)
+
 # Class: GArc
 
 class GArc(GFillableObject):
@@ -1296,6 +1481,7 @@ class GArc(GFillableObject):
         Sets the starting angle for this <code>GArc</code> object.
         """
         self.start = start
+        self._boundsChanged()
         self.updateProperties(start=start)
 
 # Public method: getStartAngle
@@ -1313,6 +1499,7 @@ class GArc(GFillableObject):
         Sets the sweep angle for this GArc object.
         """
         self.sweep = sweep
+        self._boundsChanged()
         self.updateProperties(extent=sweep)
 
 # Public method: getSweepAngle
@@ -1644,6 +1831,7 @@ class GLine(GObject):
         """
         Updates the points in the <code>GLine</code>.
         """
+        self._boundsChanged()
         gw = self.getWindow()
         if gw is None:
             return
@@ -1738,6 +1926,7 @@ class GImage(GObject):
         if self.imageModel != "PIL":
             raise Exception("Image scaling is available only if PIL is loaded")
         self.sf *= sf
+        self._boundsChanged()
         gw = self.getWindow()
         if gw is not None:
             gw._rebuild()
@@ -1864,7 +2053,7 @@ class GLabel(GObject):
         GObject.__init__(self)
         self.text = text
         self.font = self.DEFAULT_FONT
-        self.tkFont = decodeFont(self.font)
+        self.tkFont = fontMetrics.getFont(self.font)
         self.setLocation(x, y)
 
 # Public method: setFont
@@ -1876,7 +2065,8 @@ class GLabel(GObject):
         where both <code>style</code> and <code>size</code> are optional.
         """
         self.font = font
-        self.tkFont = decodeFont(self.font)
+        self.tkFont = fontMetrics.getFont(self.font)
+        self._boundsChanged()
         self.updateProperties(font=self.tkFont)
         self._updateLocation()
 
@@ -1896,6 +2086,7 @@ class GLabel(GObject):
         a new text string appears on the display.
         """
         self.text = text
+        self._boundsChanged()
         self.updateProperties(text=text)
 
 # Public method: getLabel
@@ -1913,7 +2104,7 @@ class GLabel(GObject):
         Returns the maximum distance strings in this font extend above
         the baseline.
         """
-        return self.tkFont.metrics("ascent")
+        return fontMetrics.getMetrics(self.font)["ascent"]
 
 # Public method: getDescent
 
@@ -1922,7 +2113,7 @@ class GLabel(GObject):
         Returns the maximum distance strings in this font descend below
         the baseline.
         """
-        return self.tkFont.metrics("descent")
+        return fontMetrics.getMetrics(self.font)["descent"]
 
 # Override method: getWidth
 
@@ -1930,7 +2121,7 @@ class GLabel(GObject):
         """
         Returns the width for this <code>GLabel</code>.
         """
-        return self.tkFont.measure(self.text)
+        return fontMetrics.measure(self.font, self.text)
 
 # Override method: getHeight
 
@@ -1938,7 +2129,7 @@ class GLabel(GObject):
         """
         Returns the height for this <code>GLabel</code>.
         """
-        return self.tkFont.metrics("linespace")
+        return fontMetrics.getMetrics(self.font)["linespace"]
 
 # Override method: getBounds
 
@@ -2037,6 +2228,7 @@ class GPolygon(GFillableObject):
         self.cx = x
         self.cy = y
         self.vertices.append(GPoint(x, y))
+        self._boundsChanged()
 
 # Public method: addEdge
 
@@ -2454,7 +2646,11 @@ class GTimer:
 
     def timerTicked(self):
         self.afterId = None
-        self.fn()
+        self.gw.beginUpdate()
+        try:
+            self.fn()
+        finally:
+            self.gw.endUpdate()
         if self.repeats:
             tkc = self.gw.canvas
             self.afterId = tkc.after(self.delay, self.timerTicked)
@@ -2779,6 +2975,111 @@ def parseJSUnits(spec):
     else:
         return round(value)
 
+# Private class: FontMetrics
+
+class FontMetrics:
+    """
+    This class caches font measurements, which otherwise each take a
+    round trip to Tk.  Fonts are decoded once per font string, their
+    ascent, descent and linespace are fetched once per font, and string
+    widths are kept in a bounded LRU table keyed by font string and text.
+    The caches are emptied when the Tk interpreter that owns the fonts
+    is replaced.
+    """
+
+    MAX_WIDTHS = 4096
+
+    def __init__(self, decode=None, maxWidths=MAX_WIDTHS):
+        self.decode = decode or decodeFont
+        self.maxWidths = maxWidths
+        self.fonts = { }
+        self.metrics = { }
+        self.widths = OrderedDict()
+        self.root = None
+        self.hits = 0
+        self.misses = 0
+
+    def getFont(self, spec):
+        """
+        Returns the decoded font for a font string, shared by every
+        <code>GLabel</code> that uses it.
+        """
+        self._checkRoot()
+        font = self.fonts.get(spec)
+        if font is None:
+            font = self.decode(spec)
+            self.fonts[spec] = font
+        return font
+
+    def getMetrics(self, spec):
+        """
+        Returns the metrics of a font string as a dictionary with the
+        keys <code>"ascent"</code>, <code>"descent"</code> and
+        <code>"linespace"</code>.
+        """
+        metrics = self.metrics.get(spec)
+        if metrics is None:
+            metrics = self.getFont(spec).metrics()
+            self.metrics[spec] = metrics
+        return metrics
+
+    def measure(self, spec, text):
+        """
+        Returns the width in pixels of a string in a font.
+        """
+        key = (spec, text)
+        width = self.widths.get(key)
+        if width is not None:
+            self.hits += 1
+            self.widths.move_to_end(key)
+            return width
+        self.misses += 1
+        width = self.getFont(spec).measure(text)
+        self.widths[key] = width
+        if len(self.widths) > self.maxWidths:
+            self.widths.popitem(last=False)
+        return width
+
+    def measureMany(self, spec, texts):
+        """
+        Returns the widths in pixels of several strings in one font,
+        measuring each distinct string at most once.
+        """
+        known = { }
+        widths = [ ]
+        for text in texts:
+            width = known.get(text)
+            if width is None:
+                width = self.measure(spec, text)
+                known[text] = width
+            widths.append(width)
+        return widths
+
+    def clear(self):
+        """
+        Empties the caches.
+        """
+        self.fonts.clear()
+        self.metrics.clear()
+        self.widths.clear()
+
+    def _checkRoot(self):
+        root = getattr(tkinter, "_default_root", None)
+        if root is not self.root:
+            self.clear()
+            self.root = root
+
+fontMetrics = FontMetrics()
+
+def measureMany(font, texts):
+    """
+    Returns the widths in pixels of the strings in <code>texts</code>
+    when displayed in the font string <code>font</code>, as a list.
+    Measurements are cached, so laying out many labels in the same
+    font only asks Tk about strings it has not measured before.
+    """
+    return fontMetrics.measureMany(font, texts)
+
 # Private class: SimpleTransform
 
 class SimpleTransform:
@@ -2851,34 +3152,28 @@ class EventManager:
         self.downY = tke.y
         self.downTime = time.time()
         e = GMouseEvent(tke)
-        for fn in self.mousedownListeners:
-            fn(e)
+        self.gw._dispatch(self.mousedownListeners, e)
 
     def releaseAction(self, tke):
         e = GMouseEvent(tke)
-        for fn in self.mouseupListeners:
-            fn(e)
+        self.gw._dispatch(self.mouseupListeners, e)
         if abs(self.downX - e.x) <= self.CLICK_MAX_DISTANCE:
             if abs(self.downY - e.y) <= self.CLICK_MAX_DISTANCE:
                 if time.time() - self.downTime < self.CLICK_MAX_DELAY:
-                    for fn in self.clickListeners:
-                        fn(e)
+                    self.gw._dispatch(self.clickListeners, e)
         # // Implement dblclick
 
     def motionAction(self, tke):
         e = GMouseEvent(tke)
-        for fn in self.mousemoveListeners:
-            fn(e)
+        self.gw._dispatch(self.mousemoveListeners, e)
 
     def dragAction(self, tke):
         e = GMouseEvent(tke)
-        for fn in self.dragListeners:
-            fn(e)
+        self.gw._dispatch(self.dragListeners, e)
 
     def keyAction(self, tke):
         e = GKeyEvent(tke)
-        for fn in self.keyListeners:
-            fn(e)
+        self.gw._dispatch(self.keyListeners, e)
 
     def addEventListener(self, type, fn):
         tkc = self.gw.canvas
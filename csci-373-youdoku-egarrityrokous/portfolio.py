@@ -0,0 +1,133 @@
+import multiprocessing
+import os
+import queue
+import time
+from cdcl import CdclSolver
+from dpll import dpll
+from localsearch import LocalSearch
+
+# Solvers that can only find models: when one of them returns None it has
+# run out of budget, which says nothing about satisfiability.
+INCOMPLETE_SOLVERS = ('walksat', 'probsat')
+
+# The solver configurations tried by default, most robust first. Each one is
+# a dict of keyword arguments for run_configuration.
+DEFAULT_CONFIGURATIONS = [
+    {'solver': 'cdcl', 'restarts': 'luby'},
+    {'solver': 'probsat', 'seed': 1},
+    {'solver': 'cdcl', 'restarts': 'luby', 'phase': 1, 'seed': 1},
+    {'solver': 'cdcl', 'restarts': 'geometric', 'seed': 2},
+    {'solver': 'cdcl', 'restarts': 'luby', 'phase': 1, 'seed': 3, 'var_decay': 0.8},
+    {'solver': 'dpll', 'heuristic': 'vsids'},
+    {'solver': 'cdcl', 'restarts': None, 'seed': 4},
+    {'solver': 'dpll', 'heuristic': 'moms'},
+    {'solver': 'cdcl', 'restarts': 'geometric', 'phase': 1, 'seed': 5},
+    {'solver': 'walksat', 'seed': 6},
+]
+
+
+def run_configuration(sent, solver='cdcl', **options):
+    """Solves a sentence with one solver configuration.
+
+    Parameters
+    ----------
+    sent : Cnf
+        a CNF sentence for which we want to find a satisfying model
+    solver : str
+        'cdcl' (options are passed to CdclSolver), 'dpll' (options are
+        passed to dpll), or 'walksat' or 'probsat' (seed is passed to
+        LocalSearch and the other options to LocalSearch.solve)
+
+    Returns
+    -------
+    dict[str, bool]
+        a satisfying model (if one exists), otherwise None is returned; for
+        the local search solvers None only means that no model was found
+    """
+
+    if solver == 'cdcl':
+        return CdclSolver(sent, **options).solve()
+    if solver == 'dpll':
+        return dpll(sent, **options)
+    if solver in INCOMPLETE_SOLVERS:
+        seed = options.pop('seed', None)
+        options.setdefault('max_tries', 100)
+        return LocalSearch(sent, seed).solve(solver, **options)
+    raise ValueError(f"Unknown solver: {solver}")
+
+
+def _worker(sent, index, configuration, results):
+    try:
+        model = run_configuration(sent, **configuration)
+    except Exception as error:
+        results.put((index, False, repr(error)))
+        return
+    if model is None and configuration.get('solver', 'cdcl') in INCOMPLETE_SOLVERS:
+        results.put((index, False, "gave up without finding a model"))
+    else:
+        results.put((index, True, model))
+
+
+def portfolio(sent, configurations=None, workers=None, timeout=None):
+    """Races several solver configurations on one sentence, one process each.
+
+    Runtimes of a single configuration are heavy-tailed: the same sentence
+    can take milliseconds with one branching order and minutes with another.
+    Every configuration is started in its own process, and the first one to
+    answer (satisfiable or not) wins; the others are terminated. Local
+    search configurations only answer when they find a model, so that
+    an unsatisfiable sentence is always settled by a complete solver.
+
+    Parameters
+    ----------
+    sent : Cnf
+        a CNF sentence for which we want to find a satisfying model
+    configurations : list[dict]
+        keyword arguments for run_configuration, one dict per configuration
+        (defaults to DEFAULT_CONFIGURATIONS)
+    workers : int
+        the number of configurations to race (defaults to the number of
+        CPUs); the first ones in the list are used
+    timeout : float
+        if given, TimeoutError is raised when no configuration has answered
+        after this many seconds
+
+    Returns
+    -------
+    dict[str, bool]
+        a satisfying model (if one exists), otherwise None is returned
+    """
+
+    configurations = list(configurations or DEFAULT_CONFIGURATIONS)
+    workers = workers or os.cpu_count() or 1
+    configurations = configurations[:max(1, workers)]
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_worker, args=(sent, index, configuration, results),
+                                         daemon=True)
+                 for index, configuration in enumerate(configurations)]
+    for process in processes:
+        process.start()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    errors = []
+    try:
+        while len(errors) < len(processes):
+            wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if wait <= 0:
+                raise TimeoutError(f"No solver answered within {timeout} seconds")
+            try:
+                index, ok, result = results.get(timeout=wait)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes) and results.empty():
+                    raise RuntimeError("Every portfolio worker exited without an answer")
+                continue
+            if ok:
+                return result
+            errors.append(f"{configurations[index]}: {result}")
+        raise RuntimeError("Every portfolio configuration failed: " + "; ".join(errors))
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+        results.close()
@@ -1,6 +1,6 @@
 import cnf
 from cnf import Clause, Literal, Cnf
-from util import SearchSpace, dfs
+from util import SearchSpace, SearchStats, dfs
 from random import shuffle
 
 class SatisfiabilitySearchSpace(SearchSpace):
@@ -17,6 +17,7 @@ class SatisfiabilitySearchSpace(SearchSpace):
         self.sent = sent
         self.signature = sorted(sent.get_symbols())
         self.start_state = tuple()
+        self.compiled = cnf.CompiledCnf(sent)
 
     def get_start_state(self):
         """Returns the start state.
@@ -31,6 +32,10 @@ class SatisfiabilitySearchSpace(SearchSpace):
     def is_goal_state(self, state):
         """Checks whether a given state is a goal state.
 
+        Only a state that assigns every symbol can be a goal. Such a state is
+        checked against the sentence compiled once in __init__ (see
+        cnf.CompiledCnf), without building a model dictionary.
+
         Parameters
         ----------
         state : tuple[str]
@@ -41,8 +46,9 @@ class SatisfiabilitySearchSpace(SearchSpace):
         bool
             True iff the state is a goal state
         """
-        model = {lit.get_symbol(): lit.get_polarity() for lit in state} if state is not None else None
-        return len(model) == len(self.signature) and self.sent.check_model(model)
+        if state is None or len(state) != len(self.signature):
+            return False
+        return self.compiled.check_codes(lit.code for lit in state)
 
     def get_successors(self, state):
         """Determines the possible successors of a state.
@@ -66,7 +72,7 @@ class SatisfiabilitySearchSpace(SearchSpace):
         result.append(list2)
         return result
 
-def search_solver(sent):
+def search_solver(sent, stats=None):
     """An implementation of a simple search-based satisfiability solver.
 
     This function will only work once SatisfiabilitySearchSpace is correctly implemented.
@@ -75,6 +81,9 @@ def search_solver(sent):
     ----------
     sent : cnf.Sentence
         the CNF sentence for which we want to find a satisfying model.
+    stats : stats.SolverStats
+        if given, the search counters and the time spent compiling the
+        sentence, expanding nodes and checking models are added to it
 
     Returns
     -------
@@ -82,7 +91,14 @@ def search_solver(sent):
         a satisfying model (if one exists), otherwise None is returned
     """
 
-    search_space = SatisfiabilitySearchSpace(sent)
-    state, num_visited = dfs(search_space)
+    if stats is None:
+        search_space = SatisfiabilitySearchSpace(sent)
+        state, num_visited = dfs(search_space)
+    else:
+        with stats.phase('encoding'):
+            search_space = SatisfiabilitySearchSpace(sent)
+        search_stats = SearchStats()
+        state, num_visited = dfs(search_space, stats=search_stats, timed=True)
+        stats.add_search(search_stats, state is not None)
     model = {lit.get_symbol(): lit.get_polarity() for lit in state} if state is not None else None
     return model, num_visited
@@ -0,0 +1,177 @@
+import itertools
+import math
+from collections import OrderedDict
+from functools import lru_cache
+from sudoku import SudokuBoard
+
+# Boards whose full symmetry group has more transforms than this are only
+# canonicalized under band and stack permutations and transposition.
+MAX_TRANSFORMS = 4096
+
+
+@lru_cache(maxsize=None)
+def board_symmetries(board_len, max_transforms=MAX_TRANSFORMS):
+    """Lists the validity-preserving rearrangements of the cells of a board.
+
+    Permuting the bands (groups of box rows), the rows within a band, the
+    stacks (groups of box columns) and the columns within a stack, and
+    transposing the board, all map completions of a board to completions
+    of the rearranged board. For a 4x4 board this gives 128 transforms;
+    for larger boards the full group is too big (over three million for
+    9x9), so rows and columns are then only moved a band or stack at a time.
+
+    Parameters
+    ----------
+    board_len : int
+        the width of the board (a square)
+    max_transforms : int
+        the largest group that is listed in full
+
+    Returns
+    -------
+    tuple[tuple[int]]
+        one tuple per transform: cell i of the rearranged board is cell
+        transform[i] of the original, cells being numbered in row-major order
+    """
+    n = board_len
+    width = math.isqrt(n)
+    bands = list(itertools.permutations(range(width)))
+    within = list(itertools.product(bands, repeat=width))
+    if 2 * (len(bands) * len(within)) ** 2 > max_transforms:
+        within = [(tuple(range(width)),) * width]
+    orders = [tuple(band * width + offset for band in band_order for offset in offsets[band])
+              for band_order in bands for offsets in within]
+    transforms = []
+    for rows in orders:
+        for columns in orders:
+            transforms.append(tuple(r * n + c for r in rows for c in columns))
+            transforms.append(tuple(c * n + r for r in rows for c in columns))
+    return tuple(transforms)
+
+
+def canonical_form(matrix, max_transforms=MAX_TRANSFORMS):
+    """Computes the canonical form of a board under its symmetries.
+
+    Every transform of board_symmetries is applied, and the digits of the
+    result are relabeled in order of first appearance (so the first digit
+    read becomes 1, the next new one 2, and so on). The canonical form is
+    the smallest of these, so two boards that are rearrangements and
+    relabelings of one another get the same form.
+
+    Parameters
+    ----------
+    matrix : list[list[int]]
+        the board, with zero for an empty cell and digits from 1 to its width
+
+    Returns
+    -------
+    tuple[int], tuple[int], list[int]
+        the canonical form (row-major), the transform producing it, and the
+        relabeling: relabel[d] is the canonical label of digit d, extended to
+        a permutation of all the digits (relabel[0] is 0)
+    """
+    n = len(matrix)
+    flat = [num for row in matrix for num in row]
+    best = best_transform = None
+    for transform in board_symmetries(n, max_transforms):
+        labels = {0: 0}
+        form = tuple(labels.setdefault(flat[p], len(labels)) for p in transform)
+        if best is None or form < best:
+            best, best_transform = form, transform
+    relabel = [0] * (n + 1)
+    labels = {0: 0}
+    for p in best_transform:
+        labels.setdefault(flat[p], len(labels))
+    for d in range(1, n + 1):
+        relabel[d] = labels.setdefault(d, len(labels))
+    return best, best_transform, relabel
+
+
+class SolutionCache:
+    """An LRU cache of board solutions, shared between symmetric boards.
+
+    Boards are looked up by their canonical_form, so a board that is a
+    rearrangement or relabeling of one solved before (including the same
+    board again) is answered without solving: the cached solution of the
+    canonical board is mapped back through the inverse transform. Boards
+    seen verbatim are also remembered, so exact repeats skip even the
+    canonicalization. Both tables hold at most `maxsize` boards, evicting
+    the least recently used.
+
+    Attributes
+    ----------
+    hits : int
+        lookups answered from the cache
+    misses : int
+        lookups that had to solve the board
+    """
+
+    def __init__(self, solve=None, maxsize=1024):
+        """
+        Parameters
+        ----------
+        solve : callable
+            called with a SudokuBoard on a miss, returning its solution as a
+            SudokuBoard or None (defaults to SudokuBoard.solve)
+        maxsize : int
+            the most boards kept
+        """
+        self._solve = solve or SudokuBoard.solve
+        self.maxsize = maxsize
+        self.solutions = OrderedDict()
+        self.exact = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.solutions)
+
+    def clear(self):
+        """Forgets every cached solution and resets the counters."""
+        self.solutions.clear()
+        self.exact.clear()
+        self.hits = self.misses = 0
+
+    def solve(self, board):
+        """Returns a solution of the board (see SudokuBoard.solve), from the cache if possible."""
+        n = len(board.matrix)
+        flat = tuple(num for row in board.matrix for num in row)
+        if not all(0 <= num <= n for num in flat):
+            self.misses += 1
+            return self._solve(board)
+        if flat in self.exact:
+            self.hits += 1
+            self.exact.move_to_end(flat)
+            return self._from_flat(self.exact[flat], n)
+        form, transform, relabel = canonical_form(board.matrix)
+        if form in self.solutions:
+            self.hits += 1
+            self.solutions.move_to_end(form)
+            canonical = self.solutions[form]
+        else:
+            self.misses += 1
+            solved = self._solve(SudokuBoard([list(form[i * n:(i + 1) * n]) for i in range(n)]))
+            canonical = None if solved is None else tuple(num for row in solved.matrix for num in row)
+            self._store(self.solutions, form, canonical)
+        solution = None
+        if canonical is not None:
+            original = [0] * (n + 1)
+            for d in range(1, n + 1):
+                original[relabel[d]] = d
+            cells = [0] * (n * n)
+            for i, p in enumerate(transform):
+                cells[p] = original[canonical[i]]
+            solution = tuple(cells)
+        self._store(self.exact, flat, solution)
+        return self._from_flat(solution, n)
+
+    def _store(self, table, key, value):
+        table[key] = value
+        if len(table) > self.maxsize:
+            table.popitem(last=False)
+
+    @staticmethod
+    def _from_flat(cells, n):
+        if cells is None:
+            return None
+        return SudokuBoard([list(cells[i * n:(i + 1) * n]) for i in range(n)])
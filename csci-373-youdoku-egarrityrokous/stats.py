@@ -0,0 +1,131 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class SolverStats:
+    """Counters and phase timings filled in by the solvers.
+
+    Pass an instance as the stats argument of dpll, search_solver or
+    SudokuBoard.solve to find out where a slow solve spends its effort.
+    The same instance can be passed to several solves to add them up.
+
+    Attributes
+    ----------
+    decisions : int
+        branching decisions (search nodes opened by a choice)
+    propagations : int
+        literals implied by unit propagation
+    conflicts : int
+        decisions or propagations that falsified a clause
+    backtracks : int
+        times the search undid a decision
+    max_depth : int
+        the largest number of decisions open at once
+    timings : dict[str, float]
+        seconds spent in each phase, e.g. 'encoding', 'preprocessing',
+        'propagating', 'searching' and 'checking'
+    """
+
+    def __init__(self, callback=None):
+        """
+        Parameters
+        ----------
+        callback : callable
+            if given, called as callback(event, stats, **details) when a
+            solver reports an event: 'decision' (with lit), 'conflict',
+            'backtrack', 'phase' (with name and seconds) and 'done' (with
+            result, True if a model was found)
+        """
+
+        self.callback = callback
+        self.decisions = 0
+        self.propagations = 0
+        self.conflicts = 0
+        self.backtracks = 0
+        self.max_depth = 0
+        self.timings = dict()
+
+    def emit(self, event, **details):
+        """Reports an event to the callback, if there is one."""
+        if self.callback is not None:
+            self.callback(event, self, **details)
+
+    @contextmanager
+    def phase(self, name):
+        """Times the enclosed block and adds it to timings[name]."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            seconds = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+            self.emit('phase', name=name, seconds=seconds)
+
+    def timed(self, name, function):
+        """Wraps a function so that the time spent in each call is added to timings[name].
+
+        Unlike phase, no event is reported, so this is cheap enough for
+        functions called once per search node.
+        """
+        timings = self.timings
+        timings.setdefault(name, 0.0)
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timings[name] += clock() - start
+
+        return wrapper
+
+    def add_search(self, search, found):
+        """Adds the counters of a tree search run by util.uninformed_search.
+
+        Every node with successors counts as a decision, and every dead end
+        (an expanded node without successors) as a conflict followed by a
+        backtrack. The time spent in get_successors counts as propagating
+        and the goal tests as checking models; implied literals are not
+        counted.
+
+        Parameters
+        ----------
+        search : util.SearchStats
+            the statistics of the search (collected with timed=True)
+        found : bool
+            whether the search found a goal
+        """
+        self.decisions += search.expanded - search.dead_ends
+        self.conflicts += search.dead_ends
+        self.backtracks += search.dead_ends
+        self.max_depth = max(self.max_depth, search.max_depth)
+        for name, seconds in (('searching', search.seconds),
+                              ('propagating', search.successor_seconds),
+                              ('checking', search.goal_seconds)):
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+        self.emit('done', result=found)
+
+    def as_dict(self):
+        """Returns the statistics as a JSON-serializable dict."""
+        return {'decisions': self.decisions,
+                'propagations': self.propagations,
+                'conflicts': self.conflicts,
+                'backtracks': self.backtracks,
+                'max_depth': self.max_depth,
+                'timings': dict(self.timings)}
+
+    def to_json(self, stream=None, **options):
+        """Dumps the statistics as JSON to a stream, or returns them as a string."""
+        if stream is None:
+            return json.dumps(self.as_dict(), **options)
+        json.dump(self.as_dict(), stream, **options)
+
+    def __str__(self):
+        return self.to_json()
+
+
+def phase(stats, name):
+    """Returns stats.phase(name), or a context manager doing nothing if stats is None."""
+    return nullcontext() if stats is None else stats.phase(name)
@@ -1,8 +1,31 @@
-import math
 import cnf
 import copy
+import itertools
 import math
+import os
+from array import array
+from functools import lru_cache
 from dpll import dpll
+from cdcl import CdclSolver
+from counting import count_models
+from stats import phase
+from dimacs import read_dimacs, write_dimacs
+
+# Directory in which rule_clauses persists the rules for each board size as
+# DIMACS files, so later processes can skip generating them. Unset disables it.
+RULES_CACHE_DIR = os.environ.get('YOUDOKU_RULES_CACHE')
+
+# Symbols starting with this prefix are auxiliary variables of an at-most-one
+# encoding (see at_most_one) rather than d{digit}_{row}_{col} cell variables.
+AUX_PREFIX = 'aux_'
+
+ENCODINGS = ('pairwise', 'sequential', 'commander', 'product')
+
+# The ways SudokuBoard.solve can solve a board: 'native' searches the board
+# directly (see bitmask_solve), 'sat' goes through residual_cnf and dpll.
+SOLVE_METHODS = ('native', 'sat')
+
+_rules = dict()
 
 class SudokuBoard:
     """Representation of a Sudoku board."""
@@ -44,10 +67,7 @@ class SudokuBoard:
 
         The order of the rows in the list should be top-to-bottom.
         """
-        result = []
-        for i in range(1, len(self.matrix)+1):
-            result.append({(i,j) for j in range(1, len(self.matrix[0])+1)})
-        return result
+        return list(zone_addresses(len(self.matrix))[0])
 
     def columns(self):
         """Returns the column addresses of the board.
@@ -62,10 +82,7 @@ class SudokuBoard:
 
         The order of the columns in the list should be left-to-right.
         """
-        result = []
-        for i in range(1, len(self.matrix)+1):
-            result.append({(j,i) for j in range(1, len(self.matrix[0])+1)})
-        return result
+        return list(zone_addresses(len(self.matrix))[1])
 
     def boxes(self):
         """Returns the addresses of each box of the board.
@@ -81,19 +98,15 @@ class SudokuBoard:
         The order of the columns in the list should be left-to-right, then
         top-to-bottom.
         """
-        result = []
-        width = int(len(self.matrix)**(1/2))
-        for i in range(0,len(self.matrix),width):
-            for j in range(0,len(self.matrix),width):
-                result.append(self.boxHelper(width,i,j))
-        return result
+        return list(zone_addresses(len(self.matrix))[2])
 
-    def boxHelper(self, width, rowOffset, colOffset):
-        result = set()
-        for row in range(1, width+1):
-            for col in range(1, width+1):
-                result.add((row+rowOffset,col+colOffset))
-        return result
+    def grid(self):
+        """Returns the digits of the board as a flat array in row-major order.
+
+        Cell p of the array is row p // n and column p % n of the matrix, as
+        in the index tables of zone_tables.
+        """
+        return array('i', [num for row in self.matrix for num in row])
 
     def contents(self):
         """Computes a set of clauses that describe the current board state.
@@ -118,47 +131,45 @@ class SudokuBoard:
         -------
         set[Clause]
             the set of clauses that describe the current board state
+
+        Raises
+        ------
+        ValueError
+            if a cell holds a digit outside 1 to the board's width
         """
+        n = len(self.matrix)
+        codes = digit_codes(n)
         result = set()
-        cells = self.matrix
-        for cell in cells:
-            for num in cell:
-                if num != 0:
-                    result.add(cnf.c("d" + str(num)
-                        + f"_{cells.index(cell) + 1}_{cell.index(num) + 1}"))
+        for p, num in enumerate(self.grid()):
+            if num == 0:
+                continue
+            if not 1 <= num <= n:
+                raise ValueError(f"Digit {num} at ({p // n + 1}, {p % n + 1}) is outside 1 to {n}")
+            result.add(cnf.Clause.from_codes([codes[p * n + num - 1]]))
         return result
 
-    def cnf(self):
+    def cnf(self, encoding='pairwise'):
         """Constructs a cnf.Cnf instance that fully describes this SudokuBoard.
 
         Note that the CNF sentence should express both the rules of Sudoku (each zone
         contains exactly one of each digit, no cell is empty) and the current board
         state (which cells have already been filled in by particular digits).
 
+        Parameters
+        ----------
+        encoding : str
+            how "at most once" is encoded (see at_most_one). Encodings other
+            than 'pairwise' add auxiliary symbols starting with AUX_PREFIX.
+
         Returns
         -------
         Cnf
             a CNF sentence describing this sudoku board
         """
-        result = []
-        rows = self.rows()
-        columns = self.columns()
-        boxes = self.boxes()
-        zones = rows + columns + boxes
         board_len = len(self.matrix[0])
+        return cnf.Cnf(rule_clauses(board_len, encoding=encoding) | self.contents())
 
-        clauses = set()
-        for zone in zones:
-            for d in range(1, board_len + 1):
-                exactlyOne = at_most_clauses(zone, d) + [at_least_clause(zone, d)]
-                for clause in exactlyOne:
-                    clauses.add(cnf.c(clause))
-
-        box_width = int(math.sqrt(board_len))
-        allClauses = clauses.union(nonempty_clauses(box_width)).union(self.contents())
-        return cnf.Cnf(allClauses)
-
-    def solve(self):
+    def solve(self, encoding='pairwise', stats=None, method='native'):
         """Constructs a new Sudokuboard corresponding to a valid puzzle completion.
 
         For instance, if
@@ -177,6 +188,117 @@ class SudokuBoard:
 
         If there are no valid completions, then this should return None.
         If there are multiple valid completions, then any may be returned.
+
+        By default the board is solved by bitmask_solve. With method='sat'
+        it is encoded as CNF and solved by dpll instead, which is slower but
+        is the reference the native solver can be checked against. The
+        encoding argument then selects the "at most once" encoding passed
+        on to residual_cnf (see at_most_one). Boards whose width is not a
+        square, which bitmask_solve does not handle, always take the SAT path.
+
+        If a stats.SolverStats is given, the counters and timings of the
+        search are added to it, and for the SAT path also the time spent
+        propagating candidates ('preprocessing') and building the residual
+        CNF ('encoding').
+        """
+        if method not in SOLVE_METHODS:
+            raise ValueError(f"Unknown solve method: {method}")
+        n = len(self.matrix)
+        if method == 'native' and math.isqrt(n) ** 2 == n:
+            solved = bitmask_solve(self.matrix, stats)
+            return None if solved is None else SudokuBoard(solved)
+        with phase(stats, 'preprocessing'):
+            propagated = propagate_candidates(self.matrix)
+        if propagated is None:
+            if stats is not None:
+                stats.emit('done', result=False)
+            return None
+        matrix, candidates = propagated
+        board = SudokuBoard(matrix)
+        with phase(stats, 'encoding'):
+            residual = board.residual_cnf(candidates, encoding)
+        model = dpll(residual, heuristic="cell", stats=stats)
+        if model is None:
+            return None
+        return board.from_model(model)
+
+    def is_unique(self):
+        """Checks whether this board has exactly one valid completion.
+
+        The board is first narrowed down by propagate_candidates, and the
+        models of its residual_cnf are then enumerated only until a second
+        one turns up, so a board with many completions is rejected as
+        quickly as one with a single completion is accepted.
+
+        Returns
+        -------
+        bool
+            True iff there is exactly one valid completion
+        """
+        propagated = propagate_candidates(self.matrix)
+        if propagated is None:
+            return False
+        matrix, candidates = propagated
+        return count_models(SudokuBoard(matrix).residual_cnf(candidates), limit=2) == 1
+
+    def residual_cnf(self, candidates, encoding='pairwise'):
+        """Constructs a cnf.Cnf instance for the empty cells of this board only.
+
+        Filled cells get no variables, and an empty cell only gets variables
+        for the digits still set in its candidate mask (bit d-1 stands for
+        digit d, see propagate_candidates). The sentence says that each empty
+        cell holds one of its candidates and that each digit missing from a
+        zone appears exactly once among the zone's empty cells that allow it.
+        With candidates from propagate_candidates, the models of this sentence
+        are exactly the completions of the board.
+
+        Parameters
+        ----------
+        candidates : list[int]
+            the candidate bitmask of each cell, in row-major order
+        encoding : str
+            how "at most once" is encoded (see at_most_one)
+
+        Returns
+        -------
+        Cnf
+            a CNF sentence describing the rest of this sudoku board
+        """
+        n = len(self.matrix)
+        flat = self.grid()
+        table = digit_codes(n)
+
+        def code(p, d):
+            return table[p * n + d - 1]
+
+        clauses = []
+        for p in range(n * n):
+            if flat[p] == 0:
+                clauses.append(cnf.Clause.from_codes([code(p, d) for d in mask_digits(candidates[p])]))
+        for z, zone in enumerate(zone_tables(n)[0]):
+            for d in range(1, n + 1):
+                bit = 1 << (d - 1)
+                cells = [p for p in zone if flat[p] == 0 and candidates[p] & bit]
+                if not cells:
+                    continue
+                codes = [code(p, d) for p in cells]
+                clauses.append(cnf.Clause.from_codes(codes))
+                for clause in at_most_one(codes, encoding, f"{AUX_PREFIX}z{z}_d{d}"):
+                    clauses.append(cnf.Clause.from_codes(clause))
+        return cnf.Cnf(clauses)
+
+    def from_model(self, model):
+        """Constructs a new SudokuBoard filled in according to a model of self.cnf().
+
+        Parameters
+        ----------
+        model : dict[str, bool]
+            a model assigning the d{digit}_{row}_{col} symbols
+
+        Returns
+        -------
+        SudokuBoard
+            a copy of this board with every digit made true by the model
         """
         def interpret_lit(l):
             negate = (l[0] == "!")
@@ -186,16 +308,58 @@ class SudokuBoard:
                 l = l[1:]
             d, i, j = l.split("_")
             return d, i, j, negate
-        model = dpll(self.cnf())
-        if model is None:
-            return None
         matrix = copy.deepcopy(self.matrix)
-        positive_literals = [l for l in model if model[l] == 1]
+        positive_literals = [l for l in model if model[l] == 1 and not l.startswith(AUX_PREFIX)]
         for l in positive_literals:
             d, i, j, _ = interpret_lit(l)
             matrix[int(i)-1][int(j)-1] = int(d)
         return SudokuBoard(matrix)
 
+
+class SudokuSession:
+    """An incremental solver for repeatedly solving boards of one size.
+
+    The session loads the rules of Sudoku (see rule_clauses) into a single
+    CdclSolver once. Each board is then solved under assumptions, namely the
+    unit literals of its filled-in cells, so the solver's learned clauses
+    and heuristic state carry over from one board to the next instead of
+    re-encoding and re-solving from scratch.
+    """
+
+    def __init__(self, board_len, encoding='pairwise'):
+        """
+        Parameters
+        ----------
+        board_len : int
+            the width of the boards to solve (e.g. 4 or 9)
+        encoding : str
+            how "at most once" is encoded (see at_most_one)
+        """
+        self.board_len = board_len
+        self.solver = CdclSolver(cnf.Cnf(rule_clauses(board_len, encoding=encoding)))
+
+    def solve(self, board):
+        """Constructs a new SudokuBoard corresponding to a valid completion of `board`.
+
+        Returns None if there are no valid completions (see SudokuBoard.solve),
+        which includes boards holding a digit outside 1 to board_len.
+        """
+        if len(board.matrix) != self.board_len:
+            raise ValueError(f"Expected a board of width {self.board_len}")
+        n = self.board_len
+        codes = digit_codes(n)
+        assumptions = []
+        for p, num in enumerate(board.grid()):
+            if not 0 <= num <= n:
+                return None
+            if num != 0:
+                assumptions.append(codes[p * n + num - 1])
+        model = self.solver.solve(assumptions)
+        if model is None:
+            return None
+        return board.from_model(model)
+
+
 def at_least_clause(zone, d):
     """Creates clauses for the constraint "this zone must contain digit d at least once".
 
@@ -286,6 +450,82 @@ def at_most_clauses(cells, d):
             resultTemp = ""
     return resultList
 
+def at_most_one(codes, encoding='pairwise', namespace=AUX_PREFIX):
+    """Creates clauses for the constraint "at most one of these literals is true".
+
+    Parameters
+    ----------
+    codes : list[int]
+        the literal codes (see cnf.literal_code)
+    encoding : str
+        'pairwise': a binary clause per pair of literals, n(n-1)/2 clauses;
+        'sequential': Sinz's sequential counter, 3n - 4 clauses and n - 1
+        auxiliary variables;
+        'commander': Klieber and Kwon's commander encoding over groups of 3;
+        'product': Chen's product encoding over a sqrt(n) by sqrt(n) grid.
+    namespace : str
+        prefix for the names of the auxiliary symbols, which must be unique
+        to this constraint (e.g. f"{AUX_PREFIX}z{zone}_d{digit}")
+
+    Returns
+    -------
+    list[list[int]]
+        the clauses, as lists of literal codes
+    """
+    counter = itertools.count(1)
+
+    def fresh():
+        return cnf.intern_symbol(f"{namespace}_{next(counter)}")
+
+    def pairwise(lits):
+        return [[-lits[a], -lits[b]] for a in range(len(lits)) for b in range(a + 1, len(lits))]
+
+    def sequential(lits):
+        if len(lits) <= 1:
+            return []
+        counts = [fresh() for _ in range(len(lits) - 1)]
+        clauses = [[-lits[0], counts[0]]]
+        for i in range(1, len(lits) - 1):
+            clauses += [[-lits[i], counts[i]], [-counts[i - 1], counts[i]], [-lits[i], -counts[i - 1]]]
+        clauses.append([-lits[-1], -counts[-1]])
+        return clauses
+
+    def commander(lits, group=3):
+        if len(lits) <= group + 1:
+            return pairwise(lits)
+        clauses, commanders = [], []
+        for g in range(0, len(lits), group):
+            members = lits[g:g + group]
+            if len(members) == 1:
+                commanders.append(members[0])
+                continue
+            leader = fresh()
+            commanders.append(leader)
+            clauses += pairwise(members)
+            clauses += [[-x, leader] for x in members]
+            clauses.append([-leader] + members)
+        return clauses + commander(commanders)
+
+    def product(lits):
+        if len(lits) <= 4:
+            return pairwise(lits)
+        p = math.isqrt(len(lits) - 1) + 1
+        q = -(-len(lits) // p)
+        rows = [fresh() for _ in range(p)]
+        columns = [fresh() for _ in range(q)]
+        clauses = []
+        for k, x in enumerate(lits):
+            i, j = divmod(k, q)
+            clauses += [[-x, rows[i]], [-x, columns[j]]]
+        return clauses + product(rows) + product(columns)
+
+    encoders = {'pairwise': pairwise, 'sequential': sequential,
+                'commander': commander, 'product': product}
+    if encoding not in encoders:
+        raise ValueError(f"Unknown at-most-one encoding: {encoding}")
+    return encoders[encoding](list(codes))
+
+
 def formatCells(cell, cells):
     cellsCopy = list(cells)
     a,b = cellsCopy[cell]
@@ -345,3 +585,336 @@ def nonempty_clauses(box_width):
                 temp.append(d_s)
             result.append(' || '.join(temp))
     return result
+
+
+def rule_clauses(board_len, cache_dir=None, encoding='pairwise'):
+    """Returns the clauses expressing the rules of Sudoku for a board size.
+
+    These are the "exactly one of each digit" clauses for every zone and the
+    "no cell can be empty" clauses, i.e. everything in SudokuBoard.cnf() that
+    does not depend on the board's contents. They are generated once per
+    board size and cached for the rest of the process. If a cache directory
+    is given (or RULES_CACHE_DIR is set), they are also stored there as a
+    DIMACS file and read back from it when the process first needs them.
+
+    Parameters
+    ----------
+    board_len : int
+        the width of the board (e.g. 9 for a standard Sudoku)
+    cache_dir : str
+        a directory for the persistent cache, overriding RULES_CACHE_DIR
+    encoding : str
+        how "at most once" is encoded (see at_most_one)
+
+    Returns
+    -------
+    frozenset[Clause]
+        the rule clauses
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown at-most-one encoding: {encoding}")
+    key = (board_len, encoding)
+    if key in _rules:
+        return _rules[key]
+    cache_dir = cache_dir or RULES_CACHE_DIR
+    suffix = '' if encoding == 'pairwise' else f'_{encoding}'
+    path = os.path.join(cache_dir, f'sudoku_rules_{board_len}{suffix}.cnf') if cache_dir else None
+    if path is not None and os.path.exists(path):
+        rules = frozenset(read_dimacs(path).get_clauses())
+    else:
+        n = board_len
+        codes = digit_codes(n)
+        clauses = set()
+        for z, zone in enumerate(zone_tables(n)[0]):
+            for d in range(1, n + 1):
+                lits = [codes[p * n + d - 1] for p in sorted(zone)]
+                clauses.add(cnf.Clause.from_codes(lits))
+                for clause in at_most_one(lits, encoding, f"{AUX_PREFIX}z{z}_d{d}"):
+                    clauses.add(cnf.Clause.from_codes(clause))
+        for p in range(n * n):
+            clauses.add(cnf.Clause.from_codes(codes[p * n:(p + 1) * n]))
+        rules = frozenset(clauses)
+        if path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            partial = f'{path}.{os.getpid()}.tmp'
+            with open(partial, 'w') as writer:
+                write_dimacs(cnf.Cnf(rules), writer)
+            os.replace(partial, path)
+    _rules[key] = rules
+    return rules
+
+
+def clear_rules_cache():
+    """Forgets the rule clauses cached in this process by rule_clauses."""
+    _rules.clear()
+
+
+@lru_cache(maxsize=None)
+def zone_tables(board_len):
+    """Computes the zone and peer index tables for a board size.
+
+    Cells are numbered 0 to board_len**2 - 1 in row-major order.
+
+    Returns
+    -------
+    tuple
+        (zones, peers, rows, columns, boxes): zones lists the cells of every
+        row, column and box; peers[p] lists the other cells sharing a zone
+        with cell p; rows, columns and boxes list the cells of each zone kind
+    """
+    n = board_len
+    width = int(math.isqrt(n))
+    rows = [tuple(i * n + j for j in range(n)) for i in range(n)]
+    columns = [tuple(i * n + j for i in range(n)) for j in range(n)]
+    boxes = [tuple((r + i) * n + (c + j) for i in range(width) for j in range(width))
+             for r in range(0, n, width) for c in range(0, n, width)]
+    zones = rows + columns + boxes
+    peers = [set() for _ in range(n * n)]
+    for zone in zones:
+        for p in zone:
+            peers[p].update(zone)
+    peers = [tuple(sorted(peer - {p})) for p, peer in enumerate(peers)]
+    return zones, peers, rows, columns, boxes
+
+
+@lru_cache(maxsize=None)
+def zone_addresses(board_len):
+    """Returns the (row, column) addresses of the rows, columns and boxes of a board size.
+
+    These are the cells of zone_tables(board_len) as 1-based addresses (see
+    SudokuBoard.rows), built once per size and shared by every board.
+
+    Returns
+    -------
+    tuple
+        (rows, columns, boxes), each a tuple of frozensets of addresses
+    """
+    n = board_len
+
+    def addresses(zones):
+        return tuple(frozenset((p // n + 1, p % n + 1) for p in zone) for zone in zones)
+
+    _, _, rows, columns, boxes = zone_tables(n)
+    return addresses(rows), addresses(columns), addresses(boxes)
+
+
+@lru_cache(maxsize=None)
+def digit_codes(board_len):
+    """Returns the literal codes of the d{digit}_{row}_{col} symbols of a board size.
+
+    The code saying that cell p (in row-major order) holds digit d is at
+    index p * board_len + d - 1, so the codes of one cell are contiguous.
+    The symbols are interned once per size.
+
+    Returns
+    -------
+    array
+        the codes of every cell and digit
+    """
+    n = board_len
+    return array('i', [cnf.literal_code(f"d{d}_{p // n + 1}_{p % n + 1}")
+                       for p in range(n * n) for d in range(1, n + 1)])
+
+
+def mask_digits(mask):
+    """Returns the digits whose bits (bit d-1 for digit d) are set in a candidate mask."""
+    digits = []
+    while mask:
+        low = mask & -mask
+        digits.append(low.bit_length())
+        mask ^= low
+    return digits
+
+
+def propagate_candidates(matrix):
+    """Fills in the cells of a Sudoku that simple Sudoku reasoning forces.
+
+    Every cell keeps a bitmask of its candidate digits (bit d-1 for digit d).
+    The following rules are applied until none of them changes anything:
+    - a filled cell removes its digit from the candidates of its peers;
+    - naked single: a cell with a single candidate is filled with it;
+    - hidden single: a digit that fits in only one cell of a zone goes there;
+    - pointing pairs: if a box's candidates for a digit all lie in one row
+      (or column), the digit is removed from the rest of that row (column).
+
+    Parameters
+    ----------
+    matrix : list[list[int]]
+        the board, with zero for an empty cell
+
+    Returns
+    -------
+    list[list[int]], list[int]
+        the board with the forced cells filled in, and the candidate mask of
+        every cell in row-major order; or None if the board has no completion
+    """
+    n = len(matrix)
+    zones, peers, rows, columns, boxes = zone_tables(n)
+    full = (1 << n) - 1
+    values = [0] * (n * n)
+    candidates = [full] * (n * n)
+    queue = []
+    for i, row in enumerate(matrix):
+        for j, num in enumerate(row):
+            if num != 0:
+                candidates[i * n + j] = 1 << (num - 1)
+                queue.append(i * n + j)
+
+    def eliminate(p, bit):
+        if candidates[p] & bit:
+            candidates[p] &= ~bit
+            if candidates[p] == 0:
+                return False
+            if values[p] == 0 and candidates[p] & (candidates[p] - 1) == 0:
+                queue.append(p)
+        return True
+
+    changed = True
+    while changed:
+        # naked singles (and the digits of filled cells)
+        while queue:
+            p = queue.pop()
+            if values[p]:
+                continue
+            bit = candidates[p]
+            values[p] = bit.bit_length()
+            for q in peers[p]:
+                if not eliminate(q, bit):
+                    return None
+        changed = False
+        # hidden singles
+        for zone in zones:
+            once = twice = 0
+            for p in zone:
+                twice |= once & candidates[p]
+                once |= candidates[p]
+            if once != full:
+                return None
+            singles = once & ~twice
+            for p in zone:
+                hidden = candidates[p] & singles
+                if values[p] == 0 and hidden:
+                    if hidden & (hidden - 1):
+                        return None
+                    candidates[p] = hidden
+                    queue.append(p)
+                    changed = True
+        if changed:
+            continue
+        # pointing pairs
+        for box in boxes:
+            for d in range(n):
+                bit = 1 << d
+                cells = [p for p in box if values[p] == 0 and candidates[p] & bit]
+                if len(cells) < 2:
+                    continue
+                for line in (rows[cells[0] // n], columns[cells[0] % n]):
+                    if all(p in line for p in cells):
+                        for q in line:
+                            if q not in box:
+                                if candidates[q] & bit:
+                                    changed = True
+                                if not eliminate(q, bit):
+                                    return None
+    solved = [[values[i * n + j] for j in range(n)] for i in range(n)]
+    return solved, candidates
+
+
+def bitmask_solve(matrix, stats=None):
+    """Solves a standard Sudoku by backtracking over candidate bitmasks.
+
+    Each row, column and box keeps a bitmask of the digits it already holds
+    (bit d-1 for digit d), so the candidates of a cell are the digits in
+    none of its three masks. The search always fills the empty cell with
+    the fewest candidates, failing as soon as some cell has none, and tries
+    the candidates lowest bit first.
+
+    Parameters
+    ----------
+    matrix : list[list[int]]
+        the board, with zero for an empty cell; its width must be a square
+    stats : stats.SolverStats
+        if given, the search's decisions, conflicts, backtracks, depth and
+        time ('searching') are added to it
+
+    Returns
+    -------
+    list[list[int]]
+        the completed board, or None if the board has no completion
+    """
+    n = len(matrix)
+    width = math.isqrt(n)
+    if width * width != n or any(len(row) != n for row in matrix):
+        raise ValueError("The native solver only handles square boards of square width")
+    full = (1 << n) - 1
+    row_of = [p // n for p in range(n * n)]
+    col_of = [p % n for p in range(n * n)]
+    box_of = [(p // n) // width * width + (p % n) // width for p in range(n * n)]
+    row_used, col_used, box_used = [0] * n, [0] * n, [0] * n
+    grid = [num for row in matrix for num in row]
+    empty = []
+    for p, num in enumerate(grid):
+        if num == 0:
+            empty.append(p)
+            continue
+        if not 1 <= num <= n:
+            return None
+        bit = 1 << (num - 1)
+        r, c, b = row_of[p], col_of[p], box_of[p]
+        if (row_used[r] | col_used[c] | box_used[b]) & bit:
+            return None
+        row_used[r] |= bit
+        col_used[c] |= bit
+        box_used[b] |= bit
+    counters = [0, 0, 0, 0]  # decisions, conflicts, backtracks, max depth
+
+    def search(k):
+        if k == len(empty):
+            return True
+        best, best_free, best_count = k, 0, n + 1
+        for i in range(k, len(empty)):
+            p = empty[i]
+            free = full & ~(row_used[row_of[p]] | col_used[col_of[p]] | box_used[box_of[p]])
+            count = free.bit_count()
+            if count < best_count:
+                best, best_free, best_count = i, free, count
+                if count <= 1:
+                    break
+        if best_count == 0:
+            counters[1] += 1
+            return False
+        empty[k], empty[best] = empty[best], empty[k]
+        p = empty[k]
+        r, c, b = row_of[p], col_of[p], box_of[p]
+        if best_count > 1:
+            counters[3] = max(counters[3], k + 1)
+        free = best_free
+        while free:
+            bit = free & -free
+            free ^= bit
+            if best_count > 1:
+                counters[0] += 1
+            row_used[r] |= bit
+            col_used[c] |= bit
+            box_used[b] |= bit
+            grid[p] = bit.bit_length()
+            if search(k + 1):
+                return True
+            row_used[r] ^= bit
+            col_used[c] ^= bit
+            box_used[b] ^= bit
+            counters[2] += 1
+        grid[p] = 0
+        return False
+
+    with phase(stats, 'searching'):
+        found = search(0)
+    if stats is not None:
+        stats.decisions += counters[0]
+        stats.conflicts += counters[1]
+        stats.backtracks += counters[2]
+        stats.max_depth = max(stats.max_depth, counters[3])
+        stats.emit('done', result=found)
+    if not found:
+        return None
+    return [grid[i * n:(i + 1) * n] for i in range(n)]
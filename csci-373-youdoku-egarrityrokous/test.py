@@ -1,10 +1,28 @@
 import unittest
 import cnf
+import json
+import search
 import time
 from sudoku import SudokuBoard
 from sudoku import at_most_clauses, at_least_clause, nonempty_clauses
+from sudoku import rule_clauses, clear_rules_cache, SudokuSession, at_most_one, ENCODINGS
+from sudoku import propagate_candidates, mask_digits, bitmask_solve
 from search import search_solver
-from dpll import dpll, unit_resolution, unit_resolve, DpllSearchSpace
+from cdcl import cdcl, luby, CdclSolver, SolveInterrupted
+from branching import HEURISTICS
+from util import dfs, bfs, iterative_deepening, uninformed_search, SearchStats
+from dimacs import read_dimacs, write_dimacs
+from counting import count_models, iter_models
+from portfolio import portfolio, run_configuration, DEFAULT_CONFIGURATIONS
+from cubes import lookahead_cubes, cube_and_conquer
+from stats import SolverStats
+from solutioncache import SolutionCache, canonical_form, board_symmetries
+from background import BackgroundSolver
+from pgl import GCompound, GRect, FontMetrics
+from localsearch import LocalSearch, walksat, probsat
+from benchmark import random_ksat, pigeonhole, run_benchmark, peak_memory
+from batch import parse_puzzle, format_puzzle, solve_stream
+from dpll import dpll, unit_resolution, unit_resolve, DpllSearchSpace, DpllSolver, Propagator
 
 
 
@@ -29,6 +47,32 @@ class TestClauseDisjunction(unittest.TestCase):
         assert cnf.c('FALSE') | cnf.c('FALSE') == cnf.c('FALSE')
 
 
+class TestLiteralCodes(unittest.TestCase):
+
+    def test_literal_codes(self):
+        assert cnf.l('!a').get_code() == -cnf.l('a').get_code()
+        assert cnf.l('a').negate() == cnf.l('!a')
+        assert cnf.lookup_variable('a') == cnf.l('a').get_code()
+        assert cnf.symbol_name(cnf.l('!a').get_code()) == 'a'
+
+    def test_clause_canonical(self):
+        assert cnf.c('b || !a || b') == cnf.c('!a || b')
+        assert hash(cnf.c('b || !a')) == hash(cnf.c('!a || b'))
+        assert len(cnf.c('b || !a || b')) == 2
+        assert str(cnf.c('b || !a')) == '!a || b'
+
+    def test_clause_lookup(self):
+        clause = cnf.c('!a || b')
+        assert 'a' in clause and 'b' in clause
+        assert 'c' not in clause
+        assert clause['a'] is False and clause['b'] is True
+
+    def test_pickle_by_symbol(self):
+        import pickle
+        sent = cnf.sentence('!a || b', 'c')
+        assert pickle.loads(pickle.dumps(sent)) == sent
+
+
 class TestSudokuBoard(unittest.TestCase):
 
     def test_board_str(self):
@@ -96,6 +140,42 @@ class TestSudokuBoard(unittest.TestCase):
                     {(3, 3), (3, 4), (4, 3), (4, 4)}]
         assert board.boxes() == expected
 
+    def test_zones_are_shared(self):
+        board = SudokuBoard([[0] * 9 for _ in range(9)])
+        other = SudokuBoard([[1] * 9 for _ in range(9)])
+        assert board.rows()[3] is other.rows()[3]
+        assert board.boxes() is not other.boxes()
+
+    def test_grid(self):
+        board = SudokuBoard([[1, 2], [3, 4]])
+        self.assertEqual(list(board.grid()), [1, 2, 3, 4])
+
+    def test_contents_repeated_rows(self):
+        board = SudokuBoard([[1, 0, 0, 1],
+                             [1, 0, 0, 1],
+                             [0, 0, 0, 0],
+                             [0, 0, 0, 0]])
+        expected = {cnf.c('d1_1_1'), cnf.c('d1_1_4'), cnf.c('d1_2_1'), cnf.c('d1_2_4')}
+        self.assertEqual(board.contents(), expected)
+
+    def test_contents_digit_out_of_range(self):
+        board = SudokuBoard([[5, 0, 0, 0], [0] * 4, [0] * 4, [0] * 4])
+        with self.assertRaisesRegex(ValueError, r"5 at \(1, 1\)"):
+            board.contents()
+        board.matrix[0][0] = -1
+        with self.assertRaises(ValueError):
+            board.cnf()
+
+    def test_25x25(self):
+        board = SudokuBoard([[0] * 25 for _ in range(25)])
+        board.matrix[0][:5] = [5, 4, 3, 2, 1]
+        self.assertEqual(len(board.boxes()), 25)
+        self.assertEqual(len(board.contents()), 5)
+        solved = board.solve()
+        self.assertEqual(solved.matrix[0][:5], [5, 4, 3, 2, 1])
+        assert all(len({solved.matrix[i - 1][j - 1] for (i, j) in zone}) == 25
+                   for zone in solved.rows() + solved.columns() + solved.boxes())
+
 
 class TestAtLeastClause(unittest.TestCase):
 
@@ -772,6 +852,28 @@ class TestCnfConversion(unittest.TestCase):
 
 
 
+class TestRuleClauses(unittest.TestCase):
+
+    def test_rules_cached(self):
+        assert rule_clauses(4) is rule_clauses(4)
+        board = SudokuBoard([[0, 0, 0, 3],
+                             [0, 0, 0, 0],
+                             [0, 0, 0, 0],
+                             [0, 1, 0, 0]])
+        self.assertEqual(board.cnf().get_clauses(), rule_clauses(4) | board.contents())
+
+    def test_rules_persisted(self):
+        import os
+        import tempfile
+        with tempfile.TemporaryDirectory() as cache_dir:
+            clear_rules_cache()
+            rules = rule_clauses(4, cache_dir)
+            assert os.path.exists(os.path.join(cache_dir, 'sudoku_rules_4.cnf'))
+            clear_rules_cache()
+            self.assertEqual(rule_clauses(4, cache_dir), rules)
+            clear_rules_cache()
+
+
 class TestCheckModel(unittest.TestCase):
 
     def test_check_model1(self):
@@ -799,6 +901,24 @@ class TestCheckModel(unittest.TestCase):
         assert not sent.check_model(model)
 
 
+class TestCompiledCnf(unittest.TestCase):
+
+    def test_matches_check_model(self):
+        import itertools
+        sent = cnf.sentence('!a || b || e', 'a || !b', 'b || !e', 'd || !e',
+                            '!b || !c || !f', 'a || !e', '!b || f', 'a || !a')
+        compiled = cnf.CompiledCnf(sent)
+        symbols = sorted(sent.get_symbols())
+        for values in itertools.product([False, True], repeat=len(symbols)):
+            model = dict(zip(symbols, values))
+            codes = [cnf.literal_code(sym, value) for sym, value in model.items()]
+            self.assertEqual(compiled.check_codes(codes), sent.check_model(model))
+
+    def test_false_clause(self):
+        compiled = cnf.CompiledCnf(cnf.sentence('FALSE', 'a'))
+        assert not compiled.check_codes([cnf.literal_code('a')])
+
+
 class TestSearchSolver(unittest.TestCase):
 
     def test_search_solver1(self):
@@ -843,6 +963,47 @@ class TestSearchSolver(unittest.TestCase):
 
 
 
+class TestUninformedSearch(unittest.TestCase):
+
+    def space(self):
+        return search.SatisfiabilitySearchSpace(cnf.sentence('a || b', '!a || c', '!c || d', '!d || !b'))
+
+    def test_orders_and_stats(self):
+        stats = SearchStats()
+        state, count = dfs(self.space(), stats=stats, timed=True)
+        self.assertEqual([str(lit) for lit in state], ['a', '!b', 'c', 'd'])
+        self.assertEqual(count, stats.visited)
+        self.assertEqual(stats.generated, 2 * stats.expanded - 8)
+        self.assertEqual(stats.max_depth, 4)
+        assert stats.max_frontier >= 4 and stats.aborted is None
+        assert stats.successor_seconds > 0 and stats.nodes_per_second > 0
+        self.assertEqual(json.loads(stats.to_json())['visited'], count)
+        state, _ = bfs(self.space())
+        self.assertEqual([str(lit) for lit in state], ['!a', 'b', '!c', '!d'])
+
+    def test_budgets(self):
+        stats = SearchStats()
+        self.assertEqual(dfs(self.space(), max_nodes=3, stats=stats), (None, 3))
+        self.assertEqual(stats.aborted, 'nodes')
+        state, _ = dfs(self.space(), max_depth=3)
+        assert state is None
+
+    def test_frontier_argument_rejected(self):
+        from queue import Queue
+        with self.assertRaises(TypeError):
+            uninformed_search(self.space(), Queue())
+
+    def test_iterative_deepening(self):
+        stats = SearchStats()
+        state, count = iterative_deepening(self.space(), stats=stats)
+        self.assertEqual([str(lit) for lit in state], ['a', '!b', 'c', 'd'])
+        self.assertEqual(stats.iterations, 5)
+        state, _ = iterative_deepening(self.space(), max_depth=2)
+        assert state is None
+        state, _ = iterative_deepening(search.SatisfiabilitySearchSpace(cnf.sentence('a', '!a')))
+        assert state is None
+
+
 class TestUnitResolve(unittest.TestCase):
 
     def test_unit_resolve1(self):
@@ -926,6 +1087,32 @@ class TestUnitResolution(unittest.TestCase):
 
 
 
+class TestPropagator(unittest.TestCase):
+
+    def test_propagate_chain(self):
+        sent = cnf.sentence('!a', 'a || b', '!b || c', '!c || !d', 'd || e', 'f || g')
+        propagator = Propagator(sent)
+        assert propagator.propagate() is None
+        implied = {cnf.symbol_name(lit): lit > 0 for lit in propagator.trail}
+        self.assertEqual(implied, {'a': False, 'b': True, 'c': True, 'd': False, 'e': True})
+
+    def test_conflict_and_backtrack(self):
+        propagator = Propagator(cnf.sentence('a || !c', '!b || c'))
+        assert propagator.propagate() is None
+        propagator.new_level()
+        propagator.enqueue(cnf.l('!a').get_code())
+        propagator.enqueue(cnf.l('b').get_code())
+        assert propagator.propagate() is not None
+        propagator.cancel_until(0)
+        assert propagator.trail == []
+        assert propagator.value(cnf.l('a').get_code()) == 0
+
+    def test_unsatisfiable_units(self):
+        propagator = Propagator(cnf.sentence('a', '!a || b', '!b'))
+        assert propagator.propagate() is not None
+        assert propagator.conflict is not None
+
+
 class TestDpllSearchSpace(unittest.TestCase):
 
     def test_dpll_search_space1(self):
@@ -1013,6 +1200,413 @@ class TestDpll(unittest.TestCase):
         self.assertEqual(result, {'a': True, 'b': True, 'c': False, 'd': True, 'e': True, 'f': True})
 
 
+class TestDpllSolver(unittest.TestCase):
+
+    def test_matches_dfs(self):
+        clauses = ['a || b',
+                   '!a || b || e',
+                   'a || !b',
+                   'b || !e',
+                   'd || !e',
+                   '!b || !c || !f',
+                   'a || !e',
+                   '!b || f',
+                   '!b || c']
+        for subset in [clauses, clauses[1:], clauses[:-1], clauses[2:6]]:
+            sent = cnf.sentence(*subset)
+            self.assertEqual(dpll(sent, search='trail'), dpll(sent, search='dfs'))
+
+    def test_search_space_backtracks_trail(self):
+        space = DpllSearchSpace(cnf.sentence('a || b || c', '!b || !c', '!a || !b'))
+        self.assertEqual(space.get_successors((cnf.l('a'), cnf.l('!b'))),
+                         [(cnf.l('a'), cnf.l('!b'), cnf.l('!c')),
+                          (cnf.l('a'), cnf.l('!b'), cnf.l('c'))])
+        self.assertEqual(space.get_successors((cnf.l('!a'), cnf.l('b'))),
+                         [(cnf.l('!a'), cnf.l('b'), cnf.l('!c'))])
+        self.assertEqual(len(space.get_successors((cnf.l('a'),))), 1)
+
+    def test_unsatisfiable(self):
+        solver = DpllSolver(cnf.sentence('a || b', '!a || b', 'a || !b', '!a || !b'))
+        assert solver.solve() is None
+        assert solver.num_nodes > 0
+
+
+class TestBranchingHeuristics(unittest.TestCase):
+
+    clauses = ['a || b',
+               '!a || b || e',
+               'a || !b',
+               'b || !e',
+               'd || !e',
+               '!b || !c || !f',
+               'a || !e',
+               '!b || f',
+               '!b || c']
+
+    def test_heuristics_unsatisfiable(self):
+        for heuristic in HEURISTICS:
+            for search in ['trail', 'dfs']:
+                assert dpll(cnf.sentence(*self.clauses), search, heuristic) is None
+
+    def test_heuristics_satisfiable(self):
+        for heuristic in HEURISTICS:
+            for search in ['trail', 'dfs']:
+                for clauses in [self.clauses[1:], self.clauses[:-1]]:
+                    sent = cnf.sentence(*clauses)
+                    model = dpll(sent, search, heuristic)
+                    assert sent.check_model(model)
+                    self.assertEqual(set(model), sent.get_symbols())
+
+    def test_cell_heuristic_search_space(self):
+        board = SudokuBoard([[0, 0, 0, 3],
+                             [0, 0, 0, 2],
+                             [3, 0, 0, 0],
+                             [4, 0, 0, 0]])
+        sent = board.cnf()
+        state, visited = dfs(DpllSearchSpace(sent, 'cell'))
+        assert sent.check_model({lit.get_symbol(): lit.get_polarity() for lit in state})
+        _, alphabetical_visited = dfs(DpllSearchSpace(sent))
+        assert visited < alphabetical_visited
+
+
+class TestCdcl(unittest.TestCase):
+
+    def test_luby(self):
+        self.assertEqual([luby(i) for i in range(1, 16)],
+                         [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8])
+
+    def test_assumption_outside_sentence(self):
+        sent = cnf.sentence('a || b', '!a || c')
+        solver = CdclSolver(sent)
+        with self.assertRaises(ValueError):
+            solver.solve([cnf.literal_code('cdcl_unrelated_symbol')])
+        model = solver.solve([cnf.literal_code('a')])
+        self.assertEqual(set(model), {'a', 'b', 'c'})
+        assert sent.check_model(model)
+
+    def test_cdcl_small(self):
+        clauses = ['a || b',
+                   '!a || b || e',
+                   'a || !b',
+                   'b || !e',
+                   'd || !e',
+                   '!b || !c || !f',
+                   'a || !e',
+                   '!b || f',
+                   '!b || c']
+        assert cdcl(cnf.sentence(*clauses)) is None
+        sent = cnf.sentence(*clauses[1:])
+        assert sent.check_model(cdcl(sent))
+        self.assertEqual(cdcl(cnf.sentence('a', '!a || b')), {'a': True, 'b': True})
+
+    def test_cdcl_pigeonhole(self):
+        # 4 pigeons do not fit in 3 holes
+        clauses = [' || '.join(f'p{i}_{h}' for h in range(3)) for i in range(4)]
+        for h in range(3):
+            for i in range(4):
+                for j in range(i + 1, 4):
+                    clauses.append(f'!p{i}_{h} || !p{j}_{h}')
+        for restarts in ['luby', 'geometric', None]:
+            assert cdcl(cnf.sentence(*clauses), restarts=restarts) is None
+
+    def test_cdcl_sudoku(self):
+        board = SudokuBoard([[5, 3, 0, 0, 7, 0, 0, 0, 0],
+                             [6, 0, 0, 1, 9, 5, 0, 0, 0],
+                             [0, 9, 8, 0, 0, 0, 0, 6, 0],
+                             [8, 0, 0, 0, 6, 0, 0, 0, 3],
+                             [4, 0, 0, 8, 0, 3, 0, 0, 1],
+                             [7, 0, 0, 0, 2, 0, 0, 0, 6],
+                             [0, 6, 0, 0, 0, 0, 2, 8, 0],
+                             [0, 0, 0, 4, 1, 9, 0, 0, 5],
+                             [0, 0, 0, 0, 8, 0, 0, 7, 9]])
+        sent = board.cnf()
+        assert sent.check_model(cdcl(sent))
+
+
+class TestPreprocessor(unittest.TestCase):
+
+    def test_rules(self):
+        sent = cnf.sentence('a || b || c', 'a || b', '!a || b || d', 'e', '!e || f || g', 'h || i')
+        simplified, preprocessor = cnf.preprocess(sent)
+        self.assertEqual(preprocessor.num_units, 1)
+        assert preprocessor.num_subsumed >= 1
+        assert preprocessor.num_strengthened >= 1
+        assert preprocessor.num_pure + preprocessor.num_eliminated > 0
+        assert len(simplified.get_clauses()) < len(sent.get_clauses())
+        model = preprocessor.extend_model(cdcl(simplified))
+        self.assertEqual(set(model), sent.get_symbols())
+        assert sent.check_model(model)
+
+    def test_unsatisfiable(self):
+        simplified, _ = cnf.preprocess(cnf.sentence('a || b', '!a || b', 'a || !b', '!a || !b'))
+        assert cnf.c('FALSE') in simplified.get_clauses()
+        assert cdcl(pigeonhole(4), preprocess=True) is None
+
+    def test_random_formulas(self):
+        import random
+        rng = random.Random(0)
+        for _ in range(100):
+            clauses = [cnf.Clause.from_codes([cnf.literal_code(f'pre{rng.randint(1, 6)}', rng.random() < 0.5)
+                                              for _ in range(rng.randint(1, 3))])
+                       for _ in range(rng.randint(1, 20))]
+            sent = cnf.Cnf(clauses)
+            model = dpll(sent, preprocess=True)
+            self.assertEqual(model is None, cdcl(sent) is None)
+            if model is not None:
+                assert sent.check_model(model)
+
+    def test_frozen(self):
+        sent = cnf.sentence('a || b', '!b || c', 'd || e')
+        frozen = [cnf.lookup_variable('b'), cnf.lookup_variable('d')]
+        simplified, _ = cnf.preprocess(sent, frozen)
+        assert {'b', 'd'} <= simplified.get_symbols()
+
+    def test_sudoku(self):
+        board = SudokuBoard([[0, 0, 0, 3],
+                             [0, 0, 0, 2],
+                             [3, 0, 0, 0],
+                             [4, 0, 0, 0]])
+        sent = board.cnf()
+        simplified, _ = cnf.preprocess(sent)
+        assert len(simplified.get_clauses()) < len(sent.get_clauses()) / 2
+        assert is_valid_completion(board, board.from_model(cdcl(sent, preprocess=True)))
+
+
+class TestModelCounting(unittest.TestCase):
+
+    def test_count_models(self):
+        sent = cnf.sentence('a || b', '!a || !b', 'c || d')
+        self.assertEqual(count_models(sent), 6)
+        self.assertEqual(count_models(sent, limit=4), 4)
+        self.assertEqual(count_models(sent, limit=10), 6)
+        self.assertEqual(count_models(pigeonhole(3)), 0)
+        self.assertEqual(count_models(cnf.sentence('FALSE')), 0)
+
+    def test_iter_models(self):
+        sent = cnf.sentence('a || b', '!a || !b', 'c || d')
+        models = list(iter_models(sent))
+        self.assertEqual(len({tuple(sorted(model.items())) for model in models}), 6)
+        assert all(sent.check_model(model) for model in models)
+        projected = list(iter_models(sent, [cnf.lookup_variable('a')]))
+        self.assertEqual(len(projected), 2)
+
+    def test_random_formulas(self):
+        import itertools
+        import random
+        rng = random.Random(1)
+        for _ in range(50):
+            clauses = [cnf.Clause.from_codes([cnf.literal_code(f'cnt{rng.randint(1, 7)}', rng.random() < 0.5)
+                                              for _ in range(rng.randint(1, 3))])
+                       for _ in range(rng.randint(1, 15))]
+            sent = cnf.Cnf(clauses)
+            symbols = sorted(sent.get_symbols())
+            expected = sum(sent.check_model(dict(zip(symbols, values)))
+                           for values in itertools.product([False, True], repeat=len(symbols)))
+            self.assertEqual(count_models(sent), expected)
+            self.assertEqual(count_models(sent, limit=200), expected)
+
+    def test_sudoku(self):
+        self.assertEqual(count_models(SudokuBoard([[0] * 4 for _ in range(4)]).cnf()), 288)
+        assert SudokuBoard([[0, 0, 0, 3],
+                            [0, 0, 0, 2],
+                            [3, 0, 0, 0],
+                            [4, 0, 0, 0]]).is_unique()
+        assert not SudokuBoard([[0, 0, 0, 3],
+                                [0, 0, 0, 2],
+                                [3, 3, 0, 0],
+                                [4, 0, 0, 0]]).is_unique()
+        board = SudokuBoard([[8, 0, 0, 0, 0, 0, 0, 0, 0],
+                             [0, 0, 3, 6, 0, 0, 0, 0, 0],
+                             [0, 7, 0, 0, 9, 0, 2, 0, 0],
+                             [0, 5, 0, 0, 0, 7, 0, 0, 0],
+                             [0, 0, 0, 0, 4, 5, 7, 0, 0],
+                             [0, 0, 0, 1, 0, 0, 0, 3, 0],
+                             [0, 0, 1, 0, 0, 0, 0, 6, 8],
+                             [0, 0, 8, 5, 0, 0, 0, 1, 0],
+                             [0, 9, 0, 0, 0, 0, 4, 0, 0]])
+        assert board.is_unique()
+        board.matrix[0][0] = 0
+        assert not board.is_unique()
+
+
+class TestPortfolio(unittest.TestCase):
+
+    def test_portfolio(self):
+        sent = random_ksat(50, 200, seed=3)
+        model = portfolio(sent, workers=3)
+        self.assertEqual(model is None, cdcl(sent) is None)
+        assert model is None or sent.check_model(model)
+        assert portfolio(pigeonhole(4), workers=3) is None
+
+    def test_configurations(self):
+        sent = random_ksat(30, 90, seed=5)
+        for configuration in DEFAULT_CONFIGURATIONS:
+            model = run_configuration(sent, **configuration)
+            assert model is not None and sent.check_model(model)
+        with self.assertRaises(RuntimeError):
+            portfolio(sent, [{'solver': 'walk'}], workers=2)
+
+    def test_local_search_does_not_answer_unsat(self):
+        configurations = [{'solver': 'walksat', 'max_flips': 100, 'max_tries': 1},
+                          {'solver': 'cdcl'}]
+        assert portfolio(pigeonhole(3), configurations, workers=2) is None
+        with self.assertRaises(RuntimeError):
+            portfolio(pigeonhole(3), configurations[:1], workers=1)
+
+
+class TestLocalSearch(unittest.TestCase):
+
+    def test_finds_models(self):
+        sent = random_ksat(50, 200, seed=3)
+        for search in (walksat, probsat):
+            model = search(sent, seed=1)
+            assert model is not None and sent.check_model(model)
+            self.assertEqual(set(model), {cnf.symbol_name(var) for var in sent.get_variables()})
+
+    def test_incremental_counts(self):
+        sent = random_ksat(20, 91, seed=1)
+        search = LocalSearch(sent, seed=2)
+        for _ in range(200):
+            search.flip(search.rng.randint(1, len(search.variables)))
+        values = search.values
+        true_counts = [sum(values[abs(lit)] == (lit > 0) for lit in clause) for clause in search.clauses]
+        self.assertEqual(search.num_true, true_counts)
+        self.assertEqual(set(search.unsat), {i for i, count in enumerate(true_counts) if count == 0})
+        for var in range(1, len(search.variables) + 1):
+            breaks = sum(1 for i, clause in enumerate(search.clauses)
+                         if true_counts[i] == 1 and any(abs(lit) == var and values[var] == (lit > 0)
+                                                        for lit in clause))
+            makes = sum(1 for i, clause in enumerate(search.clauses)
+                        if true_counts[i] == 0 and any(abs(lit) == var for lit in clause))
+            self.assertEqual((search.breaks[var], search.makes[var]), (breaks, makes))
+
+    def test_budget(self):
+        assert walksat(pigeonhole(3), max_flips=1000, seed=0) is None
+        assert probsat(pigeonhole(3), max_flips=10 ** 9, max_seconds=0.05, seed=0) is None
+        assert walksat(cnf.sentence('a', 'FALSE')) is None
+        with self.assertRaises(ValueError):
+            LocalSearch(pigeonhole(2)).solve('gsat')
+
+
+class TestCubeAndConquer(unittest.TestCase):
+
+    def test_cubes_cover_models(self):
+        sent = random_ksat(20, 60, seed=2)
+        cubes = lookahead_cubes(sent, 3)
+        assert 1 <= len(cubes) <= 8
+        models = list(iter_models(sent))
+        for model in models:
+            matching = [cube for cube in cubes
+                        if all(model[cnf.symbol_name(lit)] == (lit > 0) for lit in cube)]
+            self.assertEqual(len(matching), 1)
+
+    def test_cube_and_conquer(self):
+        sent = random_ksat(50, 200, seed=3)
+        model = cube_and_conquer(sent, workers=2)
+        self.assertEqual(model is None, cdcl(sent) is None)
+        assert model is None or sent.check_model(model)
+        assert cube_and_conquer(pigeonhole(4), depth=3, workers=2) is None
+        assert cube_and_conquer(cnf.sentence('a', '!a')) is None
+
+    def test_spawned_workers(self):
+        import multiprocessing
+        # symbols interned only in this process shift the numbering that a
+        # spawned worker would assign
+        for i in range(40):
+            cnf.intern_symbol(f'spawn_padding_{i}')
+        sent = random_ksat(30, 120, seed=4, prefix='spawned')
+        context = multiprocessing.get_context('spawn')
+        model = cube_and_conquer(sent, depth=3, workers=2, context=context)
+        self.assertEqual(model is None, cdcl(sent) is None)
+        assert model is None or sent.check_model(model)
+        assert cube_and_conquer(pigeonhole(3), depth=2, workers=2, context=context) is None
+
+
+class TestSolverStats(unittest.TestCase):
+
+    def test_dpll_stats(self):
+        events = []
+        stats = SolverStats(callback=lambda event, stats, **details: events.append(event))
+        sent = random_ksat(30, 128, seed=1)
+        model = dpll(sent, heuristic='vsids', stats=stats)
+        self.assertEqual(stats.decisions, events.count('decision'))
+        self.assertEqual(stats.conflicts, events.count('conflict'))
+        self.assertEqual(events[-1], 'done')
+        assert stats.decisions > 0 and stats.propagations > 0
+        assert 0 < stats.max_depth <= 30
+        assert stats.timings['propagating'] <= stats.timings['searching']
+        self.assertEqual(model is None, dpll(sent) is None)
+
+    def test_search_solver_stats(self):
+        stats = SolverStats()
+        search_solver(cnf.sentence('a || b', '!a || b', '!a || !b'), stats=stats)
+        self.assertEqual(stats.max_depth, 2)
+        assert stats.conflicts > 0
+        assert {'encoding', 'searching', 'checking'} <= set(stats.timings)
+
+    def test_sudoku_stats(self):
+        import io
+        stats = SolverStats()
+        board = SudokuBoard([[1, 0, 0, 0],
+                             [0, 0, 0, 0],
+                             [0, 0, 0, 0],
+                             [0, 0, 0, 0]])
+        board.solve(stats=stats, method='sat')
+        board.solve(stats=stats, method='sat')
+        assert {'preprocessing', 'encoding', 'searching'} <= set(stats.timings)
+        native = SolverStats()
+        board.solve(stats=native)
+        self.assertEqual(set(native.timings), {'searching'})
+        assert native.decisions > 0
+        out = io.StringIO()
+        stats.to_json(out)
+        self.assertEqual(json.loads(out.getvalue())['decisions'], stats.decisions)
+
+
+class TestDimacs(unittest.TestCase):
+
+    def test_read_dimacs(self):
+        lines = ['c a comment',
+                 'p cnf 3 2',
+                 ' 1 -3 0',
+                 '2 3',
+                 ' -1 0',
+                 '%',
+                 '0']
+        self.assertEqual(read_dimacs(lines), cnf.sentence('x1 || !x3', 'x2 || x3 || !x1'))
+
+    def test_round_trip(self):
+        import io
+        sent = cnf.sentence('!d1_1_1 || !d1_1_2', 'd1_1_1 || d2_1_1', 'FALSE')
+        stream = io.StringIO()
+        write_dimacs(sent, stream)
+        stream.seek(0)
+        self.assertEqual(read_dimacs(stream), sent)
+
+    def test_generators(self):
+        self.assertEqual(random_ksat(20, 91, seed=7), random_ksat(20, 91, seed=7))
+        self.assertEqual(len(random_ksat(20, 91, seed=7).get_clauses()), 91)
+        assert cdcl(pigeonhole(4)) is None
+
+    def test_run_benchmark(self):
+        corpus = [('php3-2', pigeonhole(2)), ('uf20', random_ksat(20, 91, seed=1))]
+        records = list(run_benchmark(corpus, ['search_solver', 'cdcl']))
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[0]['result'], 'UNSAT')
+        self.assertEqual(records[2]['result'], 'skipped')
+        assert records[3]['peak_kb'] > 0
+
+    def test_peak_memory_stops_tracing(self):
+        import tracemalloc
+
+        def failing(sent):
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            peak_memory(failing, pigeonhole(2))
+        assert not tracemalloc.is_tracing()
+
+
 class TestDpllSpeed(unittest.TestCase):
 
     def test_dpll_contrastive(self):
@@ -1134,6 +1728,486 @@ class TestSudokuBoardSolve(unittest.TestCase):
         solved = board.solve()
         assert solved is not None
 
+class TestPropagateCandidates(unittest.TestCase):
+
+    def test_mask_digits(self):
+        self.assertEqual(mask_digits(0b1011), [1, 2, 4])
+        self.assertEqual(mask_digits(0), [])
+
+    def test_singles_fill_board(self):
+        matrix, candidates = propagate_candidates([[4, 1, 2, 3],
+                                                   [2, 3, 4, 1],
+                                                   [3, 4, 1, 2],
+                                                   [0, 0, 0, 0]])
+        self.assertEqual(matrix[3], [1, 2, 3, 4])
+        self.assertEqual(candidates[12:], [1, 2, 4, 8])
+
+    def test_contradiction(self):
+        assert propagate_candidates([[0, 0, 0, 3],
+                                     [0, 0, 0, 2],
+                                     [3, 3, 0, 0],
+                                     [4, 0, 0, 0]]) is None
+
+    def test_residual_cnf(self):
+        board = SudokuBoard([[1, 0, 0, 0],
+                             [0, 0, 0, 0],
+                             [0, 0, 0, 0],
+                             [0, 0, 0, 0]])
+        matrix, candidates = propagate_candidates(board.matrix)
+        residual = SudokuBoard(matrix).residual_cnf(candidates)
+        assert len(residual.get_clauses()) < len(board.cnf().get_clauses())
+        assert residual.get_symbols() < board.cnf().get_symbols()
+        assert 'd1_1_1' not in residual.get_symbols()
+        assert 'd1_1_2' not in residual.get_symbols()
+
+    def test_solve_9x9(self):
+        board = SudokuBoard([[8, 0, 0, 0, 0, 0, 0, 0, 0],
+                             [0, 0, 3, 6, 0, 0, 0, 0, 0],
+                             [0, 7, 0, 0, 9, 0, 2, 0, 0],
+                             [0, 5, 0, 0, 0, 7, 0, 0, 0],
+                             [0, 0, 0, 0, 4, 5, 7, 0, 0],
+                             [0, 0, 0, 1, 0, 0, 0, 3, 0],
+                             [0, 0, 1, 0, 0, 0, 0, 6, 8],
+                             [0, 0, 8, 5, 0, 0, 0, 1, 0],
+                             [0, 9, 0, 0, 0, 0, 4, 0, 0]])
+        assert is_valid_completion(board, board.solve())
+
+
+class TestBitmaskSolve(unittest.TestCase):
+
+    def test_matches_sat(self):
+        boards = [[[0, 0, 0, 3], [0, 0, 0, 2], [3, 0, 0, 0], [4, 0, 0, 0]],
+                  [[0, 0, 0, 3], [0, 0, 0, 2], [3, 3, 0, 0], [4, 0, 0, 0]],
+                  [[2, 0, 0, 3], [0, 0, 0, 2], [0, 3, 1, 0], [4, 0, 0, 0]],
+                  [[5, 0, 0, 0], [0] * 4, [0] * 4, [0] * 4],
+                  [[0] * 9 for _ in range(9)]]
+        for matrix in boards:
+            board = SudokuBoard(matrix)
+            native, sat = board.solve(), board.solve(method='sat')
+            self.assertEqual(native is None, sat is None)
+            assert native is None or is_valid_completion(board, native)
+
+    def test_solve_16x16(self):
+        board = SudokuBoard([[0] * 16 for _ in range(16)])
+        board.matrix[0][:4] = [16, 15, 14, 13]
+        board.matrix[5][5] = 1
+        assert is_valid_completion(board, board.solve())
+
+    def test_hard_9x9_speed(self):
+        board = SudokuBoard([[8, 0, 0, 0, 0, 0, 0, 0, 0],
+                             [0, 0, 3, 6, 0, 0, 0, 0, 0],
+                             [0, 7, 0, 0, 9, 0, 2, 0, 0],
+                             [0, 5, 0, 0, 0, 7, 0, 0, 0],
+                             [0, 0, 0, 0, 4, 5, 7, 0, 0],
+                             [0, 0, 0, 1, 0, 0, 0, 3, 0],
+                             [0, 0, 1, 0, 0, 0, 0, 6, 8],
+                             [0, 0, 8, 5, 0, 0, 0, 1, 0],
+                             [0, 9, 0, 0, 0, 0, 4, 0, 0]])
+        start = time.perf_counter()
+        solved = board.solve()
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(str(solved), str(board.solve(method='sat')))
+
+    def test_bad_arguments(self):
+        with self.assertRaises(ValueError):
+            SudokuBoard([[0] * 4 for _ in range(4)]).solve(method='dlx')
+        with self.assertRaises(ValueError):
+            bitmask_solve([[0] * 6 for _ in range(6)])
+
+    def test_non_square_width_falls_back_to_sat(self):
+        for n in (2, 3, 6):
+            board = SudokuBoard([[0] * n for _ in range(n)])
+            self.assertEqual(board.solve(), board.solve(method='sat'))
+
+
+class TestSolutionCache(unittest.TestCase):
+
+    def test_symmetries(self):
+        self.assertEqual(len(board_symmetries(4)), 128)
+        self.assertEqual(len(set(board_symmetries(4))), 128)
+        self.assertEqual(len(board_symmetries(9)), 72)
+
+    def test_canonical_form(self):
+        board = [[0, 0, 0, 3], [0, 0, 0, 2], [3, 0, 0, 0], [4, 0, 0, 0]]
+        relabeled = [[0, 0, 0, 1], [0, 0, 0, 4], [1, 0, 0, 0], [2, 0, 0, 0]]
+        transposed = [list(column) for column in zip(*board)]
+        swapped = [board[1], board[0], board[3], board[2]]
+        form = canonical_form(board)[0]
+        for other in (relabeled, transposed, swapped):
+            self.assertEqual(canonical_form(other)[0], form)
+        self.assertNotEqual(canonical_form([[1, 2, 0, 0]] + [[0] * 4] * 3)[0],
+                            canonical_form([[1, 0, 2, 0]] + [[0] * 4] * 3)[0])
+
+    def test_hits_and_mapping_back(self):
+        cache = SolutionCache()
+        board = SudokuBoard([[0, 0, 0, 3], [0, 0, 0, 2], [3, 0, 0, 0], [4, 0, 0, 0]])
+        transposed = SudokuBoard([list(column) for column in zip(*board.matrix)])
+        relabeled = SudokuBoard([[{0: 0, 2: 4, 3: 1, 4: 2}[num] for num in row] for row in board.matrix])
+        for other in (board, board, transposed, relabeled):
+            assert is_valid_completion(other, cache.solve(other))
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+        unsolvable = SudokuBoard([[0, 0, 0, 3], [0, 0, 0, 2], [3, 3, 0, 0], [4, 0, 0, 0]])
+        assert cache.solve(unsolvable) is None and cache.solve(unsolvable) is None
+        self.assertEqual((cache.hits, cache.misses), (4, 2))
+        assert cache.solve(SudokuBoard([[5, 0, 0, 0], [0] * 4, [0] * 4, [0] * 4])) is None
+
+    def test_bounded(self):
+        cache = SolutionCache(maxsize=2)
+        boards = [[[d, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, d]] for d in (1, 2)]
+        boards.append([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+        boards.append([[1, 2, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+        for matrix in boards:
+            board = SudokuBoard(matrix)
+            solved = cache.solve(board)
+            assert solved is None or is_valid_completion(board, solved)
+        self.assertLessEqual(len(cache), 2)
+        self.assertLessEqual(len(cache.exact), 2)
+
+    def test_9x9(self):
+        cache = SolutionCache()
+        board = SudokuBoard([[5, 3, 0, 0, 7, 0, 0, 0, 0],
+                             [6, 0, 0, 1, 9, 5, 0, 0, 0],
+                             [0, 9, 8, 0, 0, 0, 0, 6, 0],
+                             [8, 0, 0, 0, 6, 0, 0, 0, 3],
+                             [4, 0, 0, 8, 0, 3, 0, 0, 1],
+                             [7, 0, 0, 0, 2, 0, 0, 0, 6],
+                             [0, 6, 0, 0, 0, 0, 2, 8, 0],
+                             [0, 0, 0, 4, 1, 9, 0, 0, 5],
+                             [0, 0, 0, 0, 8, 0, 0, 7, 9]])
+        moved = SudokuBoard(board.matrix[3:6] + board.matrix[:3] + board.matrix[6:])
+        self.assertEqual(str(cache.solve(board)), str(board.solve()))
+        self.assertEqual(str(cache.solve(moved)), str(moved.solve()))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+
+class TestBackgroundSolver(unittest.TestCase):
+
+    def test_interrupt(self):
+        import threading
+        solver = CdclSolver(pigeonhole(7))
+        threading.Timer(0.05, solver.interrupt).start()
+        with self.assertRaises(SolveInterrupted):
+            solver.solve()
+        self.assertEqual(solver.propagator.decision_level(), 0)
+
+    def test_only_newest_result(self):
+        import threading
+        started, release = threading.Event(), threading.Event()
+        solved = []
+
+        def solve(board):
+            if board == 'first':
+                started.set()
+                release.wait(5)
+                raise SolveInterrupted()
+            solved.append(board)
+            return board.upper()
+
+        background = BackgroundSolver(solve, release.set)
+        try:
+            background.submit('first')
+            started.wait(5)
+            background.submit('second')
+            version = background.submit('third')
+            deadline = time.monotonic() + 5
+            while background.busy() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(background.poll(), (version, 'THIRD'))
+            self.assertEqual(background.poll(), None)
+            assert 'second' not in solved
+        finally:
+            background.close()
+
+    def test_interrupt_before_solve(self):
+        solver = CdclSolver(pigeonhole(3))
+        solver.interrupt()
+        with self.assertRaises(SolveInterrupted):
+            solver.solve()
+        self.assertEqual(solver.solve(), None)
+        solver.interrupt()
+        solver.clear_interrupt()
+        self.assertEqual(solver.solve(), None)
+
+    def test_failed_solve(self):
+        def solve(board):
+            if board == 'bad':
+                raise KeyError(board)
+            return board.upper()
+
+        background = BackgroundSolver(solve)
+        try:
+            background.submit('bad')
+            deadline = time.monotonic() + 5
+            while background.busy() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertFalse(background.busy())
+            with self.assertRaises(KeyError):
+                background.poll()
+            version = background.submit('good')
+            while background.busy() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(background.poll(), (version, 'GOOD'))
+        finally:
+            background.close()
+
+    def test_sudoku_boards(self):
+        session = SudokuSession(4)
+        background = BackgroundSolver(SolutionCache(session.solve).solve, session.solver.interrupt,
+                                      session.solver.clear_interrupt)
+        try:
+            board = SudokuBoard([[0, 0, 0, 3], [0, 0, 0, 2], [3, 0, 0, 0], [4, 0, 0, 0]])
+            background.submit(board)
+            deadline = time.monotonic() + 5
+            while background.busy() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            version, solution = background.poll()
+            self.assertEqual(version, 1)
+            assert is_valid_completion(board, solution)
+        finally:
+            background.close()
+
+
+class RecordingCanvas:
+    """Stands in for a tkinter canvas, keeping its items in stacking order."""
+
+    def __init__(self):
+        self.items = []
+        self.next_id = 1
+        self.created = 0
+
+    def create_rectangle(self, x0, y0, x1, y1, **options):
+        item = self.next_id
+        self.next_id += 1
+        self.created += 1
+        self.items.append(item)
+        return item
+
+    def delete(self, item):
+        if item == 'all':
+            self.items.clear()
+        elif item in self.items:
+            self.items.remove(item)
+
+    def tag_lower(self, item, below):
+        self.items.remove(item)
+        self.items.insert(self.items.index(below), item)
+
+    def itemconfig(self, item, **options):
+        pass
+
+    def coords(self, item, *args):
+        return [0, 0, 0, 0]
+
+    def move(self, item, dx, dy):
+        pass
+
+
+class RecordingWindow:
+
+    def __init__(self):
+        self.canvas = RecordingCanvas()
+        self.base = GCompound()
+        self.base.gw = self
+
+
+class TestGCompound(unittest.TestCase):
+
+    def test_hit_index_matches_scan(self):
+        import random
+        compound = GCompound()
+        rects = []
+        for i in range(200):
+            rect = GRect(random.Random(i).randint(0, 500), random.Random(-i).randint(0, 500), 30, 20)
+            rects.append(rect)
+            compound.add(rect)
+        compound.add(GRect(0, 0, 2000, 2000))
+        compound.getElement(-1).sendToBack()
+        rects[0].setLocation(900, 900)
+        compound.remove(rects[1])
+        rng = random.Random(0)
+        for _ in range(500):
+            x, y = rng.uniform(-50, 950), rng.uniform(-50, 950)
+            expected = next((g for g in reversed(compound.contents) if g.contains(x, y)), None)
+            self.assertIs(compound.getElementAt(x, y), expected)
+        self.assertIs(compound.getElementAt(910, 910), rects[0])
+
+    def test_incremental_install(self):
+        window = RecordingWindow()
+        back, front = GCompound(), GCompound()
+        back.add(GRect(0, 0, 10, 10))
+        front.add(GRect(0, 0, 10, 10))
+        window.base.add(back)
+        window.base.add(front)
+        canvas = window.canvas
+        created = canvas.created
+        added = GRect(5, 5, 10, 10)
+        back.add(added)
+        self.assertEqual(canvas.created, created + 1)
+        self.assertEqual(canvas.items, back._canvasItems() + front._canvasItems())
+        back.remove(added)
+        assert added.tkid is None
+        self.assertEqual(canvas.items, back._canvasItems() + front._canvasItems())
+        window.base.removeAll()
+        self.assertEqual(canvas.items, [])
+
+
+class TestFontMetrics(unittest.TestCase):
+
+    class CountingFont:
+
+        def __init__(self, spec):
+            self.spec = spec
+            self.calls = 0
+
+        def measure(self, text):
+            self.calls += 1
+            return 10 * len(text)
+
+        def metrics(self):
+            self.calls += 1
+            return {'ascent': 12, 'descent': 3, 'linespace': 15}
+
+    def test_cached_measurements(self):
+        decoded = []
+
+        def decode(spec):
+            decoded.append(spec)
+            return self.CountingFont(spec)
+
+        metrics = FontMetrics(decode, maxWidths=2)
+        self.assertEqual(metrics.measure('12px Arial', 'ab'), 20)
+        self.assertEqual(metrics.measure('12px Arial', 'ab'), 20)
+        self.assertEqual(metrics.getMetrics('12px Arial')['ascent'], 12)
+        self.assertEqual(metrics.getMetrics('12px Arial')['linespace'], 15)
+        self.assertEqual(decoded, ['12px Arial'])
+        font = metrics.getFont('12px Arial')
+        self.assertEqual(font.calls, 2)
+        self.assertEqual((metrics.hits, metrics.misses), (1, 1))
+        self.assertEqual(metrics.measureMany('12px Arial', ['a', 'abc', 'a', 'ab']), [10, 30, 10, 20])
+        self.assertEqual(font.calls, 5)
+        self.assertLessEqual(len(metrics.widths), 2)
+
+
+def is_valid_completion(board, solved):
+    """Checks that solved fills in every empty cell of board without breaking a rule."""
+    digits = set(range(1, len(board.matrix) + 1))
+    for zone in solved.rows() + solved.columns() + solved.boxes():
+        if {solved.matrix[i - 1][j - 1] for (i, j) in zone} != digits:
+            return False
+    return all(num in (0, solved.matrix[i][j])
+               for i, row in enumerate(board.matrix) for j, num in enumerate(row))
+
+
+class TestSudokuSession(unittest.TestCase):
+
+    def test_session_matches_solve(self):
+        session = SudokuSession(4)
+        boards = [[[0, 0, 0, 3], [0, 0, 0, 2], [3, 0, 0, 0], [4, 0, 0, 0]],
+                  [[0, 0, 0, 3], [0, 0, 0, 2], [3, 3, 0, 0], [4, 0, 0, 0]],
+                  [[2, 0, 0, 3], [0, 0, 0, 2], [0, 3, 1, 0], [4, 0, 0, 0]],
+                  [[4, 1, 2, 3], [2, 3, 4, 1], [3, 4, 1, 2], [0, 0, 0, 0]],
+                  [[0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]]]
+        for matrix in boards * 2:
+            board = SudokuBoard(matrix)
+            solved = session.solve(board)
+            if board.solve() is None:
+                assert solved is None
+            else:
+                assert is_valid_completion(board, solved)
+
+    def test_session_9x9(self):
+        session = SudokuSession(9)
+        board = SudokuBoard([[5, 3, 0, 0, 7, 0, 0, 0, 0],
+                             [6, 0, 0, 1, 9, 5, 0, 0, 0],
+                             [0, 9, 8, 0, 0, 0, 0, 6, 0],
+                             [8, 0, 0, 0, 6, 0, 0, 0, 3],
+                             [4, 0, 0, 8, 0, 3, 0, 0, 1],
+                             [7, 0, 0, 0, 2, 0, 0, 0, 6],
+                             [0, 6, 0, 0, 0, 0, 2, 8, 0],
+                             [0, 0, 0, 4, 1, 9, 0, 0, 5],
+                             [0, 0, 0, 0, 8, 0, 0, 7, 9]])
+        self.assertEqual(str(session.solve(board)), str(board.solve()))
+
+    def test_session_digit_out_of_range(self):
+        session = SudokuSession(4)
+        board = SudokuBoard([[5, 0, 0, 0], [0] * 4, [0] * 4, [0] * 4])
+        assert board.solve() is None
+        assert session.solve(board) is None
+        board = SudokuBoard([[1, 0, 0, 0], [0] * 4, [0] * 4, [0] * 4])
+        assert is_valid_completion(board, session.solve(board))
+
+
+class TestAtMostOne(unittest.TestCase):
+
+    def test_at_most_one(self):
+        import itertools
+        for encoding in ENCODINGS:
+            for n in range(1, 8):
+                codes = [cnf.intern_symbol(f'amo{n}_{i}') for i in range(n)]
+                clauses = at_most_one(codes, encoding, f'aux_test_{encoding}_{n}')
+                solver = CdclSolver(cnf.Cnf([cnf.Clause.from_codes(clause) for clause in clauses]
+                                            + [cnf.Clause.from_codes([x, -x]) for x in codes]))
+                for bits in itertools.product([False, True], repeat=n):
+                    model = solver.solve([x if bit else -x for x, bit in zip(codes, bits)])
+                    self.assertEqual(model is not None, sum(bits) <= 1, (encoding, bits))
+
+    def test_solve_with_each_encoding(self):
+        small = SudokuBoard([[0, 0, 0, 3],
+                             [0, 0, 0, 2],
+                             [3, 0, 0, 0],
+                             [4, 0, 0, 0]])
+        large = SudokuBoard([[0] * 9 for _ in range(9)])
+        large.matrix[0][0] = 5
+        for encoding in ENCODINGS:
+            assert is_valid_completion(small, small.solve(encoding))
+            assert is_valid_completion(large, large.solve(encoding))
+            model = cdcl(large.cnf(encoding))
+            if encoding != 'pairwise':
+                assert any(symbol.startswith('aux_') for symbol in model)
+            assert is_valid_completion(large, large.from_model(model))
+
+    def test_fewer_rule_clauses(self):
+        pairwise = len(rule_clauses(16))
+        for encoding in ('sequential', 'commander', 'product'):
+            self.assertLess(len(rule_clauses(16, encoding=encoding)), pairwise / 2)
+
+    def test_unknown_encoding(self):
+        with self.assertRaises(ValueError):
+            rule_clauses(4, encoding='binary')
+        with self.assertRaises(ValueError):
+            at_most_one([cnf.intern_symbol('a'), cnf.intern_symbol('b')], 'binary')
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_parse_and_format(self):
+        line = '53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79'
+        board = parse_puzzle(line)
+        self.assertEqual(board.matrix[0], [5, 3, 0, 0, 7, 0, 0, 0, 0])
+        self.assertEqual(format_puzzle(board), line.replace('.', '0'))
+        big = parse_puzzle('G' + '0' * 255)
+        self.assertEqual(big.matrix[0][0], 16)
+        self.assertEqual(format_puzzle(big)[0], 'G')
+
+    def test_solve_stream(self):
+        import io
+        lines = ['0003000230004000\n', '\n', '0003000233004000\n', '4123234134120000\n']
+        out = io.StringIO()
+        stats = solve_stream(lines, out, workers=2, chunk_size=1)
+        self.assertEqual(out.getvalue().split(), ['2413134231244231', 'unsolvable', '4123234134121234'])
+        self.assertEqual(stats['puzzles'], 3)
+        self.assertEqual(stats['unsolvable'], 1)
+        assert stats['p50_ms'] <= stats['p99_ms']
+
+    def test_invalid_lines(self):
+        import io
+        lines = ['12345\n', '0003000230004000\n', '000x000230004000\n', '9003000230004000\n']
+        out = io.StringIO()
+        stats = solve_stream(lines, out, workers=1, chunk_size=4)
+        self.assertEqual(out.getvalue().split(), ['invalid', '2413134231244231', 'invalid', 'invalid'])
+        self.assertEqual(stats['puzzles'], 1)
+        self.assertEqual(stats['invalid'], 3)
+
 """
 class TestLargeSudokuBoardSolve(unittest.TestCase):
 
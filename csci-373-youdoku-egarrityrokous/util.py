@@ -1,5 +1,7 @@
-from queue import LifoQueue, Queue
+import json
+import time
 from abc import ABC, abstractmethod
+from collections import deque
 
 class SearchSpace(ABC):
 
@@ -44,52 +46,227 @@ class SearchSpace(ABC):
         """
 
 
-def uninformed_search(space, container, verbose=False):
+class SearchStats:
+    """Counters and timings collected by uninformed_search.
+
+    Attributes
+    ----------
+    visited : int
+        nodes taken off the frontier (and goal-tested)
+    expanded : int
+        nodes whose successors were generated
+    generated : int
+        successors put on the frontier
+    dead_ends : int
+        expanded nodes that had no successors
+    max_frontier : int
+        the largest size the frontier reached
+    max_depth : int
+        the depth of the deepest node visited
+    iterations : int
+        the number of depth-limited searches run by iterative deepening
+    seconds : float
+        total wall time of the search
+    successor_seconds, goal_seconds : float
+        time spent in get_successors and is_goal_state (only measured when
+        the search is run with timed=True)
+    aborted : str
+        'nodes' or 'time' if the search stopped on a budget, otherwise None
+    """
+
+    def __init__(self):
+        self.visited = 0
+        self.expanded = 0
+        self.generated = 0
+        self.dead_ends = 0
+        self.max_frontier = 0
+        self.max_depth = 0
+        self.iterations = 0
+        self.seconds = 0.0
+        self.successor_seconds = 0.0
+        self.goal_seconds = 0.0
+        self.aborted = None
+
+    @property
+    def nodes_per_second(self):
+        return self.visited / self.seconds if self.seconds > 0 else None
+
+    def as_dict(self):
+        """Returns the statistics as a JSON-serializable dict."""
+        result = dict(vars(self))
+        result['nodes_per_second'] = self.nodes_per_second
+        return result
+
+    def to_json(self):
+        return json.dumps(self.as_dict())
+
+    def __str__(self):
+        return ', '.join(f'{key}={value}' for key, value in self.as_dict().items())
+
+
+def uninformed_search(space, *, lifo=True, verbose=False, max_depth=None, max_nodes=None,
+                      max_seconds=None, timed=False, stats=None):
     """General-purpose algorithm for "uninformed" search, e.g. DFS or BFS.
 
+    The frontier is a collections.deque holding (state, depth) pairs, used
+    as a stack for DFS and as a queue for BFS. Successors are added in the
+    order get_successors returns them, so DFS expands the last one first.
+
     Parameters
     ----------
-    space : SnakePuzzleSearchSpace
+    space : SearchSpace
         The search space
-    container : queue.Queue or queue.LifoQueue
-        The container for processing nodes of the search tree.
+    lifo : bool
+        True for depth-first order, False for breadth-first order (keyword
+        only, like the remaining options: the frontier is no longer passed in)
+    verbose : bool
+        if True, prints the statistics when the search ends
+    max_depth : int
+        if given, nodes at this depth are goal-tested but not expanded
+    max_nodes : int
+        if given, the search gives up after visiting this many nodes
+    max_seconds : float
+        if given, the search gives up after about this many seconds
+    timed : bool
+        if True, the time spent in get_successors and is_goal_state is
+        measured (which costs a little per node)
+    stats : SearchStats
+        if given, the counters are added to this object
+
+    Returns
+    -------
+    state, int
+        a goal state (or None if none was found) and the number of nodes visited
     """
 
-    container.put(space.get_start_state())
-    count = 0
-    while not container.empty():
-        count += 1
-        next_state = container.get()
-        if space.is_goal_state(next_state):
-            if verbose:
-                print(f"Search nodes visited: {count}")
-            return next_state, count
-        successors = space.get_successors(next_state)
+    stats = SearchStats() if stats is None else stats
+    start = time.perf_counter()
+    deadline = None if max_seconds is None else start + max_seconds
+    clock = time.perf_counter
+    frontier = deque([(space.get_start_state(), 0)])
+    pop = frontier.pop if lifo else frontier.popleft
+    push = frontier.append
+    is_goal_state, get_successors = space.is_goal_state, space.get_successors
+    visited = expanded = generated = dead_ends = 0
+    max_frontier = 1
+    deepest = 0
+    goal = None
+    while frontier:
+        if max_nodes is not None and visited >= max_nodes:
+            stats.aborted = 'nodes'
+            break
+        if deadline is not None and visited % 256 == 0 and clock() > deadline:
+            stats.aborted = 'time'
+            break
+        state, depth = pop()
+        visited += 1
+        if depth > deepest:
+            deepest = depth
+        if timed:
+            before = clock()
+            found = is_goal_state(state)
+            stats.goal_seconds += clock() - before
+        else:
+            found = is_goal_state(state)
+        if found:
+            goal = state
+            break
+        if max_depth is not None and depth >= max_depth:
+            continue
+        if timed:
+            before = clock()
+            successors = get_successors(state)
+            stats.successor_seconds += clock() - before
+        else:
+            successors = get_successors(state)
+        expanded += 1
+        depth += 1
         for successor in successors:
-            container.put(successor)
+            push((successor, depth))
+        if not successors:
+            dead_ends += 1
+        generated += len(successors)
+        if len(frontier) > max_frontier:
+            max_frontier = len(frontier)
+    stats.visited += visited
+    stats.expanded += expanded
+    stats.generated += generated
+    stats.dead_ends += dead_ends
+    stats.max_frontier = max(stats.max_frontier, max_frontier)
+    stats.max_depth = max(stats.max_depth, deepest)
+    stats.iterations += 1
+    stats.seconds += time.perf_counter() - start
     if verbose:
-        print(f"Search nodes visited: {count}")
-    return None, count
+        print(f"Search nodes visited: {visited} ({stats})")
+    return goal, visited
 
 
-def bfs(space):
+def bfs(space, **options):
     """Runs breadth-first search (BFS) on a search space.
 
     Parameters
     ----------
     space : SearchSpace
         The search space
+    options
+        budgets, timing and stats (see uninformed_search)
     """
-    return uninformed_search(space, Queue())
+    return uninformed_search(space, lifo=False, **options)
 
 
-def dfs(space):
+def dfs(space, **options):
     """Runs depth-first search (DFS) on a search space.
 
     Parameters
     ----------
     space : SearchSpace
         The search space
+    options
+        budgets, timing and stats (see uninformed_search)
+    """
+    return uninformed_search(space, lifo=True, **options)
+
+
+def iterative_deepening(space, max_depth=None, max_nodes=None, max_seconds=None, **options):
+    """Runs depth-limited DFS with limits 0, 1, 2, ... until a goal is found.
+
+    The search stops without a goal when a whole depth-limited search never
+    reached its limit (so the space has been exhausted), when max_depth has
+    been searched, or when a budget runs out. Budgets cover all iterations.
+
+    Parameters
+    ----------
+    space : SearchSpace
+        The search space
+    max_depth : int
+        the deepest limit to try (None for no limit)
+    max_nodes, max_seconds
+        budgets over all iterations (see uninformed_search)
+    options
+        timing and stats (see uninformed_search)
+
+    Returns
+    -------
+    state, int
+        a goal state (or None if none was found) and the number of nodes visited
     """
-    return uninformed_search(space, LifoQueue())
 
+    stats = options.pop('stats', None) or SearchStats()
+    deadline = None if max_seconds is None else time.perf_counter() + max_seconds
+    limit = 0
+    while max_depth is None or limit <= max_depth:
+        nodes = None if max_nodes is None else max_nodes - stats.visited
+        seconds = None if deadline is None else deadline - time.perf_counter()
+        if (nodes is not None and nodes <= 0) or (seconds is not None and seconds <= 0):
+            stats.aborted = 'nodes' if nodes is not None and nodes <= 0 else 'time'
+            break
+        deepest = stats.max_depth
+        stats.max_depth = 0
+        goal, _ = uninformed_search(space, lifo=True, max_depth=limit, max_nodes=nodes,
+                                    max_seconds=seconds, stats=stats, **options)
+        reached = stats.max_depth
+        stats.max_depth = max(deepest, reached)
+        if goal is not None or stats.aborted is not None or reached < limit:
+            return goal, stats.visited
+        limit += 1
+    return None, stats.visited
@@ -1,5 +1,7 @@
 from pgl import GWindow, GOval, GRect, GCompound, GLabel, GLine
-from sudoku import SudokuBoard
+from sudoku import SudokuBoard, SudokuSession
+from solutioncache import SolutionCache
+from background import BackgroundSolver
 
 # Constants
 
@@ -26,6 +28,8 @@ SUBCELL_TEXT_COLOR = "#ffffff"
 BOX_WIDTH = CELL_WIDTH * 2
 SUBCELL_WIDTH = CELL_WIDTH // 2
 
+SOLUTION_POLL_DELAY = 16          # Milliseconds between checks for a solution
+
 
 
 class SudokuDigitSelectorSubcell(GCompound):
@@ -115,20 +119,22 @@ class SudokuCell(GCompound):
             self.render_label()
 
     def render_label(self):
-        if self.label is not None:
-            self.remove(self.label)
         if self.digit is not None and self.digit != "0":
-            self.label = GLabel(self.digit)
+            text = self.digit
         else:
-            self.label = GLabel("")
-        self.label.setFont(CELL_FONT)
+            text = ""
+        if self.label is None:
+            self.label = GLabel(text)
+            self.label.setFont(CELL_FONT)
+            self.add(self.label)
+        elif self.label.getLabel() != text:
+            self.label.setLabel(text)
         if self.only_a_suggestion:
             self.label.setColor(SUGGESTION_TEXT_COLOR)
-        else:            
+        else:
             self.label.setColor(CELL_TEXT_COLOR)
-        self.add(self.label, 
-                 CELL_WIDTH//2 - self.label.getWidth()//2, 
-                 CELL_WIDTH//2 + self.label.getAscent()//2 - 7)
+        self.label.setLocation(CELL_WIDTH//2 - self.label.getWidth()//2,
+                               CELL_WIDTH//2 + self.label.getAscent()//2 - 7)
 
         
     def mousedown(self):
@@ -193,6 +199,11 @@ class VisualSudokuBoard(GCompound):
         self.add(boxes[1], BOX_WIDTH, 0)
         self.add(boxes[2], 0, BOX_WIDTH)
         self.add(boxes[3], BOX_WIDTH, BOX_WIDTH)
+        self.session = SudokuSession(4)
+        self.solutions = SolutionCache(self.session.solve)
+        self.solver = BackgroundSolver(self.solutions.solve, self.session.solver.interrupt,
+                                       self.session.solver.clear_interrupt)
+        self.polling = False
 
     def mousedown(self, x, y):
         self.getElementAt(x, y).mousedown(x % BOX_WIDTH, y % BOX_WIDTH)
@@ -202,9 +213,23 @@ class VisualSudokuBoard(GCompound):
             box.mouseup(x % BOX_WIDTH, y % BOX_WIDTH)
         self.check_satisfiability()
 
-    def check_satisfiability(self):        
-        board = self.get_board()
-        solution = board.solve()
+    def check_satisfiability(self):
+        self.solver.submit(self.get_board())
+        if not self.polling:
+            self.polling = True
+            self.getWindow().canvas.after(SOLUTION_POLL_DELAY, self.poll_solution)
+
+    def poll_solution(self):
+        busy = self.solver.busy()
+        if busy:
+            self.getWindow().canvas.after(SOLUTION_POLL_DELAY, self.poll_solution)
+        else:
+            self.polling = False
+        result = self.solver.poll()
+        if result is not None:
+            self.show_solution(result[1])
+
+    def show_solution(self, solution):
         if solution is None:
             self.suggest_solution([[0,0,0,0],[0,0,0,0],[0,0,0,0],[0,0,0,0]])
             self.set_background_color(CELL_BAD_COLOR)